@@ -30,8 +30,10 @@ COLORRED = "\033[0;31m{0}\033[00m"
 SW_PATHS = {'module': 'modules/network/arubaoss',
             'module_utils': 'module_utils/network/arubaoss',
             'plugins_action': 'plugins/action/arubaoss.py',
+            'plugins_connection': 'plugins/connection/arubaoss_rest.py',
             'plugins_cliconf': 'plugins/cliconf/arubaoss.py',
             'plugins_terminal': 'plugins/terminal/arubaoss.py',
+            'plugins_callback': 'plugins/callback/arubaoss_perf.py',
             }
 CONTROLLER_PATHS = {'module': 'modules/network/arubaos_controller'}
 CONTROLLER_SSH_PATHS = {'module': 'modules/network/aruba',
@@ -77,6 +79,8 @@ def define_arguments():
               '\n\n'
               'Files added/modified:'
               '\n\t- <ansible_module_path>/plugins/action/arubaoss.py'
+              '\n\t- <ansible_module_path>/plugins/connection/arubaoss_rest.py'
+              '\n\t- <ansible_module_path>/plugins/callback/arubaoss_perf.py'
               '\n\t- <ansible_module_path>/config/base.yml'
               '\n\t- <ansible_module_path>/plugins/terminal/aruba.py'
               '\n\t- <ansible_module_path>/plugins/cliconf/aruba.py'
@@ -180,6 +184,8 @@ def install_sw_modules():
 
     Files added/modified:
         <ansible_module_path>/plugins/action/arubaoss.py
+        <ansible_module_path>/plugins/connection/arubaoss_rest.py
+        <ansible_module_path>/plugins/callback/arubaoss_perf.py
         <ansible_module_path>/config/base.yml
 
     :return: None
@@ -304,6 +310,8 @@ def remove_modules():
 
     Files removed/modified:
         <ansible_module_path>/plugins/action/arubaoss.py
+        <ansible_module_path>/plugins/connection/arubaoss_rest.py
+        <ansible_module_path>/plugins/callback/arubaoss_perf.py
         <ansible_module_path>/config/base.yml
         <ansible_module_path>/modules/network/aruba/aruba_command.py
         <ansible_module_path>/modules/network/aruba/aruba_config.py
@@ -26,16 +26,31 @@
 # USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 #
 
+import os
+import random
 import re
-
-from ansible.module_utils._text import to_text
+import select
+import socket
+import ssl
+import sys
+import tempfile
+import threading
+from io import BytesIO
+
+from ansible.module_utils._text import to_bytes, to_text
 from ansible.module_utils.basic import env_fallback
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.network.common.utils import to_list, ComplexList
-from ansible.module_utils.connection import exec_command, Connection, ConnectionError
-from ansible.module_utils.six import iteritems
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.module_utils.six import iteritems, reraise
+from ansible.module_utils.six.moves import http_client
+from ansible.module_utils.six.moves.urllib.parse import urlparse
 from ansible.module_utils.urls import fetch_url
-from time import sleep
+from ansible.module_utils.network.arubaoss.arubaoss_diff import diff, is_equal
+from ansible.module_utils.network.arubaoss.arubaoss_json import elements_of, iter_elements
+from ansible.module_utils.network.arubaoss.arubaoss_governor import Governor, GovernorTimeout, HAS_FCNTL
+from multiprocessing.pool import ThreadPool
+from time import sleep, time
 import json
 
 try:
@@ -48,6 +63,58 @@ except ImportError:
 _DEVICE_CONNECTION = None
 _DEVICE_CONFIGS = {}
 
+# Controller-side cache of per-switch data discovered over REST, such as
+# the api_version, shared by all tasks (and playbook runs) hitting a host.
+_HOST_CACHE_DIR = os.path.expanduser(
+    os.environ.get('ARUBAOSS_CACHE_DIR', '~/.ansible/arubaoss_cache'))
+_API_VERSION_CACHE_TTL = 3600
+
+# Features of the switch and the firmware families not supporting them
+_UNSUPPORTED_FEATURES = {
+    'dhcp_server': ('YA', 'YB'),
+}
+
+#REST API version is hardcoded to v6.0 to login & get REST Version
+#Ansible supported from 16.08 which has REST v6.0
+#If any changes done with REST API supported in switch side
+#needs to be updated here.
+_BOOTSTRAP_API_VERSION = 'v6.0'
+
+# Keep-alive connections kept open to the switch within a module run,
+# also the number of reads run_bulk/get_config_bulk issue concurrently
+_HTTP_POOL_SIZE = 4
+_HTTP_POOL_IDLE_TIMEOUT = 30
+
+# Elements requested per page by iter_collection, and the query taking
+# the index of the first element and the number of elements of a page
+_REST_PAGE_SIZE = 500
+_PAGE_QUERY = 'start_index={start}&count={count}'
+
+# Requests failing for a transient reason (connection error, switch
+# busy or out of sessions) are retried up to _REST_RETRIES times, after
+# a jittered delay doubling from _RETRY_INITIAL_DELAY up to
+# _RETRY_MAX_DELAY seconds. Only methods safe to resend are retried.
+_REST_RETRIES = 3
+_RETRY_INITIAL_DELAY = 1
+_RETRY_MAX_DELAY = 16
+_RETRY_STATUS = (408, 429, 502, 503, 504)
+_IDEMPOTENT_METHODS = ('GET', 'PUT', 'DELETE')
+_SESSION_LIMIT_RE = re.compile(r'(maximum|limit)\W.*session|session\w*\W.*(maximum|limit)', re.I)
+
+# Seconds a module waits for a session slot of the switch when
+# max_sessions sessions are already open by other forks
+_GOVERNOR_TIMEOUT = 600
+
+# Requests listed as slowest in the perf summary
+_PERF_SLOWEST = 5
+
+# Switches run_fleet configures at once
+_FLEET_WORKERS = 20
+
+# Backoff between polls of long running operations, in seconds
+_POLL_INITIAL_DELAY = 1
+_POLL_MAX_DELAY = 30
+
 arubaoss_provider_spec = {
     'host': dict(),
     'port': dict(type='int'),
@@ -61,6 +128,15 @@ arubaoss_provider_spec = {
     'timeout': dict(type='int'),
     'validate_certs': dict(type='bool',default=False),
     'api_version': dict(type='str',default='None'),
+    'api_version_cache_ttl': dict(type='int'),
+    'http_pool_size': dict(type='int'),
+    'http_pool_idle_timeout': dict(type='int'),
+    'rest_page_size': dict(type='int'),
+    'perf': dict(type='bool', fallback=(env_fallback, ['ARUBAOSS_PERF'])),
+    'max_sessions': dict(type='int', fallback=(env_fallback, ['ARUBAOSS_MAX_SESSIONS'])),
+    'requests_per_second': dict(type='float',
+                                fallback=(env_fallback, ['ARUBAOSS_REQUESTS_PER_SECOND'])),
+    'rest_retries': dict(type='int', fallback=(env_fallback, ['ARUBAOSS_REST_RETRIES'])),
 }
 arubaoss_argument_spec = {
     'provider': dict(type='dict', options=arubaoss_provider_spec)
@@ -76,6 +152,15 @@ arubaoss_top_spec = {
     'use_ssl': dict(type='bool'),
     'validate_certs': dict(type='bool',default=False),
     'api_version': dict(type='str',default='None'),
+    'api_version_cache_ttl': dict(type='int'),
+    'http_pool_size': dict(type='int'),
+    'http_pool_idle_timeout': dict(type='int'),
+    'rest_page_size': dict(type='int'),
+    'perf': dict(type='bool', fallback=(env_fallback, ['ARUBAOSS_PERF'])),
+    'max_sessions': dict(type='int', fallback=(env_fallback, ['ARUBAOSS_MAX_SESSIONS'])),
+    'requests_per_second': dict(type='float',
+                                fallback=(env_fallback, ['ARUBAOSS_REQUESTS_PER_SECOND'])),
+    'rest_retries': dict(type='int', fallback=(env_fallback, ['ARUBAOSS_REST_RETRIES'])),
 }
 
 arubaoss_argument_spec.update(arubaoss_top_spec)
@@ -89,96 +174,88 @@ def check_args(module, warnings):
     pass
 
 
-class Checkversion:
-    '''
-    Here we set default REST API version as v6.0 to login &
-    retrieve REST version supported in switch.
-    '''
-
-    def __init__(self, module):
-        self._module = module
-        self._cookie = None
-
-        host = self._module.params['host']
-        port = self._module.params['port']
-
-        if self._module.params['use_ssl']:
-            proto = 'https'
-            port = port or 443
-        else:
-            proto = 'http'
-            port = port or 80
-
-        #REST API version is hardcoded to v6.0 to login & get REST Version
-        #Ansible supported from 16.08 which has REST v6.0
-        #If any changes done with REST API supported in switch side
-        #needs to be updated here.
-        api = 'v6.0'
-
-        self._url = "{}://{}:{}/rest/{}".format(proto,host,port,api)
-
-    def _send(self, url, method='POST', body={}):
-        '''Sends command to device '''
-
-        headers = {'Content-Type': 'application/json'}
-        data = self._module.jsonify(body)
-
-        if self._cookie:
-            headers['Cookie'] = self._cookie
-
-        response, headers = fetch_url(
-            self._module, url, data=body, headers=headers,
-            method=method, use_proxy=False)
-
-        return response, headers
-
+def _host_cache_path(module):
+    ''' Cache file of the switch, keyed by host:port '''
+    port = module.params['port']
+    if not port:
+        port = 443 if module.params['use_ssl'] else 80
+    key = '{}_{}'.format(module.params['host'], port)
+    return os.path.join(_HOST_CACHE_DIR, re.sub(r'[^\w.-]', '_', key) + '.json')
 
-    def login(self):
-        ''' Created login uri and saves cookie'''
-
-        password = self._module.params['password']
-        username = self._module.params['username']
 
-        url = self._url + "/login-sessions"
-        data = {"userName":username ,"password": password}
-        data = self._module.jsonify(data)
+def read_host_cache(module):
+    ''' Returns the cached data of the switch, empty if none '''
+    try:
+        with open(_host_cache_path(module), 'r') as cache_file:
+            return json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return {}
 
-        response, headers = self._send(url, body=data)
 
-        if headers['status'] == 201:
-            self._cookie = headers.get('set-cookie')
-        elif headers['status'] == 404:
-            self._module.fail_json(msg='AOS-Switch Ansible support needs minimum Firmware version of 16.08.xx', data='')
-        else:
-            self._module.fail_json(**headers)
+def write_host_cache(module, **kwargs):
+    '''
+    Updates the cached data of the switch. The file is replaced atomically
+    as several forks may refresh the same host at once. Caching is best
+    effort, so a failure to write is ignored.
+    '''
+    data = read_host_cache(module)
+    data.update(kwargs)
+    path = _host_cache_path(module)
+    try:
+        if not os.path.isdir(_HOST_CACHE_DIR):
+            os.makedirs(_HOST_CACHE_DIR, 0o700)
+        fd, tmp_path = tempfile.mkstemp(dir=_HOST_CACHE_DIR)
+        with os.fdopen(fd, 'w') as cache_file:
+            json.dump(data, cache_file)
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        pass
+
+
+def invalidate_host_cache(module):
+    ''' Drops everything cached for the switch '''
+    try:
+        os.remove(_host_cache_path(module))
+    except (IOError, OSError):
+        pass
 
-    def logout(self):
-        ''' Logout from device '''
-        url = self._url + "/login-sessions"
 
-        response, headers = self._send(url, body="", method='DELETE')
-        self._cookie = None
+def get_cached_api_version(module):
+    ''' Returns the cached api_version of the switch if not expired '''
+    ttl = module.params.get('api_version_cache_ttl')
+    if ttl is None:
+        ttl = _API_VERSION_CACHE_TTL
+    if ttl <= 0:
+        return None
 
-        if headers['status'] != 204:
-            self._module.fail_json(**headers)
+    cache = read_host_cache(module)
+    if cache.get('api_version') and \
+            time() - cache.get('api_version_time', 0) < ttl:
+        return cache['api_version']
+    return None
 
-    def get_version(self):
-        ''' GET Version from device '''
 
-        self.login()
+def get_cached_capabilities(module):
+    '''
+    Returns the cached capabilities of the switch if not expired. They
+    share the api_version_cache_ttl of the api version.
+    '''
+    ttl = module.params.get('api_version_cache_ttl')
+    if ttl is None:
+        ttl = _API_VERSION_CACHE_TTL
+    if ttl <= 0:
+        return None
 
-        url = self._url[:-5] + "/version"
-        response, headers = self._send(url, body="", method='GET')
+    cache = read_host_cache(module)
+    if cache.get('capabilities') and \
+            time() - cache.get('capabilities_time', 0) < ttl:
+        return cache['capabilities']
+    return None
 
-        if headers['status'] == 200:
-            body = response.read()
-            body=json.loads(body)
-            api=body['version_element'][len(body['version_element'])-1]['version']
-            self._module.params['api_version'] = api
-        else:
-            self._module.fail_json(**headers)
 
-        self.logout()
+def _resource(uri):
+    ''' The resource of uri, e.g. vlans for /vlans/5?start_index=0 '''
+    return uri.split('?')[0].strip('/').split('/')[0]
 
 
 def load_params(module):
@@ -187,8 +264,6 @@ def load_params(module):
         if key in arubaoss_argument_spec:
             if module.params.get(key) is None and value is not None:
                 module.params[key] = value
-    check = Checkversion(module)
-    return check.get_version()
 
 
 def get_connection(module, is_cli=False):
@@ -203,22 +278,252 @@ def get_connection(module, is_cli=False):
             return module._arubaoss_connection
         else:
             load_params(module)
-            conn = Aossapi(module)
+            provider = module.params.get('provider') or dict()
+            if provider.get('transport') == 'arubaoss_rest':
+                conn = Aossapi(module, Connection(module._socket_path))
+            else:
+                conn = Aossapi(module)
+            _close_on_exit(module, conn)
+            conn.load_api_version()
             _DEVICE_CONNECTION = conn
     return _DEVICE_CONNECTION
 
 
+def _close_on_exit(module, conn):
+    '''
+    Hooks exit_json/fail_json of the module so the REST session opened
+    by the connection is logged out once, at the end of the module run,
+    and the perf summary is returned when perf is enabled.
+    '''
+    exit_json = module.exit_json
+    fail_json = module.fail_json
+
+    def _exit_json(**kwargs):
+        conn.close()
+        if conn.perf_enabled():
+            kwargs.setdefault('perf', conn.perf_summary())
+        if conn.retried():
+            kwargs.setdefault('rest_retries', conn.retried())
+        exit_json(**kwargs)
+
+    def _fail_json(**kwargs):
+        conn.close()
+        if conn.perf_enabled():
+            kwargs.setdefault('perf', conn.perf_summary())
+        if conn.retried():
+            kwargs.setdefault('rest_retries', conn.retried())
+        fail_json(**kwargs)
+
+    module.exit_json = _exit_json
+    module.fail_json = _fail_json
+
+
+class HTTPConnectionPool:
+    '''
+    Keep-alive HTTP(S) connections to one switch, reused across the
+    requests of a module run so TCP & TLS setup is paid once. At most
+    size idle connections are kept, each for up to idle_timeout seconds.
+    '''
+
+    def __init__(self, module, proto, host, port, size, idle_timeout):
+        self._module = module
+        self._proto = proto
+        self._host = host
+        self._port = port
+        self._size = size
+        self._idle_timeout = idle_timeout
+        self._timeout = module.params.get('timeout') or 10
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _new_connection(self):
+        if self._proto == 'https':
+            if self._module.params.get('validate_certs'):
+                context = ssl.create_default_context()
+            else:
+                context = ssl._create_unverified_context()
+            return http_client.HTTPSConnection(self._host, self._port,
+                                               timeout=self._timeout,
+                                               context=context)
+        return http_client.HTTPConnection(self._host, self._port,
+                                          timeout=self._timeout)
+
+    @staticmethod
+    def _is_stale(conn):
+        '''
+        Whether the switch closed the idle connection: its socket is
+        readable, at the end of stream, while no request is pending
+        '''
+        if conn.sock is None:
+            return True
+        try:
+            return bool(select.select([conn.sock], [], [], 0)[0])
+        except (socket.error, ValueError):
+            return True
+
+    def _get(self):
+        ''' Returns an idle connection, or None if none is usable '''
+        with self._lock:
+            while self._idle:
+                conn, last_used = self._idle.pop()
+                if time() - last_used < self._idle_timeout and not self._is_stale(conn):
+                    return conn
+                conn.close()
+        return None
+
+    def _put(self, conn):
+        with self._lock:
+            if len(self._idle) < self._size:
+                self._idle.append((conn, time()))
+                return
+        conn.close()
+
+    def _release(self, conn, response):
+        ''' Returns conn to the pool once response is read to the end '''
+        if response.isclosed() and not response.will_close:
+            self._put(conn)
+        else:
+            conn.close()
+
+    def _do_request(self, conn, method, url, body, headers, stream=False):
+        parsed = urlparse(url)
+        path = parsed.path
+        if parsed.query:
+            path += '?' + parsed.query
+        conn.request(method, path, body=to_bytes(body) if body else None,
+                     headers=headers)
+        response = conn.getresponse()
+
+        info = {'url': url, 'status': response.status}
+        for key, value in response.getheaders():
+            key = key.lower()
+            if key in info and key not in ('status', 'msg', 'url'):
+                info[key] += ', ' + value
+            else:
+                info[key] = value
+
+        if stream and response.status < 400:
+            info['msg'] = 'OK'
+            return _PooledResponse(self, conn, response), info
+
+        data = response.read()
+        info['msg'] = 'OK ({0} bytes)'.format(len(data))
+        self._release(conn, response)
+
+        if response.status >= 400:
+            info['msg'] = 'HTTP Error {0}: {1}'.format(response.status, response.reason)
+            info['body'] = data
+            return None, info
+        return BytesIO(data), info
+
+    def request(self, method, url, body=None, headers=None, stream=False):
+        '''
+        Sends the request on a pooled connection. Returns the same
+        (response, info) pair as fetch_url. Idle connections the switch
+        closed are dropped before use. A GET, PUT or DELETE failing on a
+        reused connection is retried once on a new connection; other
+        errors are raised to the caller, as the switch may have applied
+        the request. With stream, the body of a successful response is
+        read by the caller as it arrives and the response must be closed.
+        '''
+        retries = 0
+        conn = self._get()
+        if conn is not None:
+            try:
+                return self._do_request(conn, method, url, body, headers, stream)
+            except (socket.error, http_client.HTTPException):
+                conn.close()
+                if method not in _IDEMPOTENT_METHODS:
+                    raise
+                retries = 1
+        conn = self._new_connection()
+        try:
+            response, info = self._do_request(conn, method, url, body, headers, stream)
+        except Exception:
+            conn.close()
+            raise
+        # Counted by the perf records of Aossapi
+        info['retries'] = retries
+        return response, info
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                self._idle.pop()[0].close()
+
+
+class _PooledResponse:
+    '''
+    Response body read from the switch as it arrives. Closing it returns
+    the connection to the pool if the body was read to the end, else the
+    connection is closed as the rest of the body is still pending.
+    '''
+
+    def __init__(self, pool, conn, response):
+        self._pool = pool
+        self._conn = conn
+        self._response = response
+
+    def read(self, amt=None):
+        return self._response.read(amt)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool._release(conn, self._response)
+
+
 class Aossapi:
     '''
     This create instance for arubaoss api. The supported version of
     api is v5.0. Previous version can be used to configure but does
     not gurantee module will work as intended or may have failure
     in cases.
+
+    A single REST session is opened on first use and shared by every
+    get_config/run_commands call of the module run. It is logged out
+    by close(), which get_connection hooks into exit_json/fail_json.
+
+    Requests failing for a transient reason, e.g. the switch answering
+    503 when busy, are retried with backoff if safe to resend: logins,
+    GET, PUT and DELETE. The number of retries is returned as
+    rest_retries.
+
+    With the arubaoss_rest connection plugin, requests are instead sent
+    through the persistent connection, which owns the REST session of
+    the switch across tasks.
+
+    GET responses are memoized for the module run. Any write through
+    run_commands drops the cached responses of the same top level
+    resource (e.g. a POST on /vlans-ports/... drops /vlans-ports/...).
     '''
 
-    def __init__(self, module):
+    def __init__(self, module, connection=None):
         self._module = module
+        self._connection = connection
         self._cookie = None
+        self._api_version_cached = False
+        self._pool = None
+        self._get_cache = {}
+        self._json_cache = {}
+        self._capabilities = None
+        self._unpaged = set()
+        self._login_lock = threading.Lock()
+        self._perf = [] if self._module.params.get('perf') else None
+        self._cache_hits = 0
+        self._governor = None
+        self._retries = self._module.params.get('rest_retries')
+        if self._retries is None:
+            self._retries = _REST_RETRIES
+        self._retried = 0
+        # The persistent connection serves one request at a time
+        self._bulk_workers = 1
+
+        if self._connection:
+            # Host, port & scheme are handled by the connection plugin
+            self._base_url = "/rest"
+            self._set_url(self._module.params['api_version'])
+            return
 
         host = self._module.params['host']
         port = self._module.params['port']
@@ -230,28 +535,251 @@ class Aossapi:
             proto = 'http'
             port = port or 80
 
-        api = self._module.params['api_version']
+        self._base_url = "{}://{}:{}/rest".format(proto,host,port)
+        self._set_url(self._module.params['api_version'])
+
+        pool_size = self._module.params.get('http_pool_size')
+        if pool_size is None:
+            pool_size = _HTTP_POOL_SIZE
+        idle_timeout = self._module.params.get('http_pool_idle_timeout')
+        if idle_timeout is None:
+            idle_timeout = _HTTP_POOL_IDLE_TIMEOUT
+
+        if pool_size > 0 and not self._module.params.get('use_proxy'):
+            self._pool = HTTPConnectionPool(self._module, proto, host, port,
+                                            pool_size, idle_timeout)
+            self._bulk_workers = pool_size
+
+        # Shared with the other forks targeting the switch, through lock
+        # files next to its host cache
+        max_sessions = self._module.params.get('max_sessions')
+        rate = self._module.params.get('requests_per_second')
+        if (max_sessions or rate) and HAS_FCNTL:
+            prefix = os.path.splitext(_host_cache_path(self._module))[0]
+            try:
+                self._governor = Governor(prefix, max_sessions, rate, _GOVERNOR_TIMEOUT)
+            except (IOError, OSError):
+                self._governor = None
+
+    def _set_url(self, api):
+        self._api = api
+        self._url = "{}/{}".format(self._base_url, api)
+
+    def load_api_version(self):
+        ''' Sets the api_version to use, from the host cache if possible '''
+        if self._connection:
+            api = self._connection.get_api_version()
+            self._module.params['api_version'] = api
+            self._set_url(api)
+            return
+
+        api = get_cached_api_version(self._module)
+        if api:
+            self._module.params['api_version'] = api
+            self._api_version_cached = True
+            self._set_url(api)
+        else:
+            self.discover_api_version()
 
-        self._url = "{}://{}:{}/rest/{}".format(proto,host,port,api)
+    def discover_api_version(self):
+        '''
+        Logs in on the bootstrap api version & retrieves the latest REST
+        version supported in switch. The session is kept and reused for
+        the requests made on that version.
+        '''
+        self._set_url(_BOOTSTRAP_API_VERSION)
+        self.login()
 
-    def _send(self, url, method='POST', body={}):
-        '''Sends command to device '''
+        url = self._base_url + "/version"
+        response, headers = self._send(url, body="", method='GET')
+
+        if headers['status'] == 200:
+            body = response.read()
+            body=json.loads(body)
+            api=body['version_element'][len(body['version_element'])-1]['version']
+            self._module.params['api_version'] = api
+        else:
+            self._module.fail_json(**headers)
+
+        write_host_cache(self._module, api_version=api, api_version_time=time())
+        self._api_version_cached = False
+        self._set_url(api)
+
+    def _send(self, url, method='POST', body={}, stream=False, retries=0):
+        '''
+        Sends command to device. With perf enabled, the exchange is
+        recorded along with the number of times it was resent.
+        '''
+        if self._governor:
+            self._governor.throttle()
+        start = time()
+        response, headers = self._send_request(url, method, body, stream)
+        retries += headers.pop('retries', 0)
+        self._record(method, url, body, headers, time() - start, retries)
+        return response, headers
+
+    def _send_request(self, url, method, body, stream):
+
+        if self._connection:
+            return self._send_persistent(url, method, body)
 
         headers = {'Content-Type': 'application/json'}
 
         data = self._module.jsonify(body)
         if self._cookie:
             headers['Cookie'] = self._cookie
+
+        if self._pool:
+            try:
+                return self._pool.request(method, url, body=body, headers=headers,
+                                          stream=stream)
+            except (socket.error, ssl.SSLError, http_client.HTTPException) as err:
+                if method not in _IDEMPOTENT_METHODS:
+                    # Not sent again, the switch may have applied it
+                    return None, {'url': url, 'status': -1,
+                                  'msg': 'Request failed: {0}'.format(to_text(err))}
+                # fetch_url reports the failure, or works around it
+                response, headers = fetch_url(
+                    self._module, url, data=body, headers=headers,
+                    method=method, use_proxy=False
+                )
+                headers['retries'] = 1
+                return response, headers
+
         response, headers = fetch_url(
             self._module, url, data=body, headers=headers,
             method=method, use_proxy=False
         )
         return response, headers
 
+    def _record(self, method, url, body, headers, elapsed, retries=0):
+        ''' Records an exchange with the switch, if perf is enabled '''
+        if self._perf is None:
+            return
+        parsed = urlparse(url)
+        uri = parsed.path + ('?' + parsed.query if parsed.query else '')
+        self._perf.append({
+            'method': method,
+            'uri': uri,
+            'status': headers.get('status'),
+            'time': elapsed,
+            'sent': len(to_bytes(body)) if body else 0,
+            'received': int(headers.get('content-length') or 0),
+            'retries': retries,
+        })
+
+    def perf_enabled(self):
+        return self._perf is not None
+
+    def perf_summary(self, slowest=_PERF_SLOWEST):
+        '''
+        Summarizes the exchanges recorded with perf enabled: the number
+        of requests & retries, the time spent waiting on the switch in
+        total and to log in & out, the bytes sent and received, the GETs
+        served from the module cache, the slowest requests and the
+        [method, uri, status, time] of every request, in order.
+        '''
+        records = list(self._perf or [])
+        auth = [rec for rec in records if rec['uri'].endswith('/login-sessions')]
+        slow = sorted(records, key=lambda rec: rec['time'], reverse=True)[:slowest]
+        return {
+            'requests': len(records),
+            'retries': sum(rec['retries'] for rec in records),
+            'total_time': round(sum(rec['time'] for rec in records), 3),
+            'auth_requests': len(auth),
+            'auth_time': round(sum(rec['time'] for rec in auth), 3),
+            'bytes_sent': sum(rec['sent'] for rec in records),
+            'bytes_received': sum(rec['received'] for rec in records),
+            'cache_hits': self._cache_hits,
+            'slowest': [dict(rec, time=round(rec['time'], 3)) for rec in slow],
+            'timings': [[rec['method'], rec['uri'], rec['status'], round(rec['time'], 4)]
+                        for rec in records],
+        }
+
+    def _send_persistent(self, url, method, body):
+        '''
+        Sends command through the persistent connection. Returns the same
+        (response, info) pair as fetch_url, so callers are unchanged.
+        '''
+        try:
+            result = self._connection.send_request(url, method=method, data=body or None)
+        except ConnectionError as exc:
+            return None, {'status': -1, 'msg': to_text(exc), 'url': url}
+
+        headers = result['headers']
+        headers.update(status=result['status'], msg=result['msg'],
+                       url=result['url'])
+        if result['status'] >= 400:
+            headers['body'] = result['body']
+            return None, headers
+        return BytesIO(to_bytes(result['body'])), headers
+
+    def _request(self, uri, method='POST', body={}, stream=False):
+        '''
+        Sends command for uri within the module session. Logs in when no
+        session is open and logs in again once if the device expired the
+        session. GET, PUT & DELETE failing for a transient reason are
+        retried with backoff. With stream, the response is not read ahead
+        by the connection pool; the caller reads and closes it.
+        '''
+        if not self._cookie and not self._connection:
+            self.login()
+
+        attempt = 0
+        while True:
+            # Built after login, which may have renegotiated the api version
+            url = self._url + uri
+            cookie = self._cookie
+            response, headers = self._send(url, body=body, method=method, stream=stream,
+                                           retries=attempt)
+
+            if headers['status'] == 401 and not self._connection:
+                with self._login_lock:
+                    # Concurrent bulk reads may all see the session expire
+                    if self._cookie == cookie:
+                        self._cookie = None
+                        self.login()
+                response, headers = self._send(url, body=body, method=method, stream=stream,
+                                               retries=attempt + 1)
+
+            if method not in _IDEMPOTENT_METHODS or not self._is_transient(headers) \
+                    or attempt >= self._retries:
+                return response, headers
+            attempt += 1
+            self._backoff(attempt)
+
+    def _is_transient(self, headers):
+        '''
+        Whether the request failed for a reason which may clear by
+        itself: the connection failed, or the switch was busy or had no
+        session left.
+        '''
+        status = headers['status']
+        if status == -1 or status in _RETRY_STATUS:
+            return True
+        if status >= 400:
+            return bool(_SESSION_LIMIT_RE.search(to_text(headers.get('body') or '')))
+        return False
+
+    def _backoff(self, attempt):
+        self._retried += 1
+        delay = min(_RETRY_INITIAL_DELAY * 2 ** (attempt - 1), _RETRY_MAX_DELAY)
+        sleep(random.uniform(delay / 2.0, delay))
+
+    def retried(self):
+        ''' Number of requests resent after a transient failure '''
+        return self._retried
+
 
     def login(self):
         ''' Created login uri and saves cookie'''
 
+        if self._governor:
+            try:
+                self._governor.acquire_session()
+            except GovernorTimeout as exc:
+                self._module.fail_json(msg=to_text(exc))
+
         password = self._module.params['password']
         username = self._module.params['username']
 
@@ -259,10 +787,23 @@ class Aossapi:
         data = {"userName":username ,"password": password}
         data = self._module.jsonify(data)
 
+        # A session not created can be asked for again
+        attempt = 0
         response, headers = self._send(url, body=data)
+        while self._is_transient(headers) and attempt < self._retries:
+            attempt += 1
+            self._backoff(attempt)
+            response, headers = self._send(url, body=data, retries=attempt)
 
         if headers['status'] == 201:
             self._cookie = headers.get('set-cookie')
+        elif headers['status'] == 404 and self._api_version_cached:
+            # Cached api_version is no longer served by the switch,
+            # e.g. after a firmware change. Rediscover, which logs in.
+            invalidate_host_cache(self._module)
+            self.discover_api_version()
+        elif headers['status'] == 404 and self._api == _BOOTSTRAP_API_VERSION:
+            self._module.fail_json(msg='AOS-Switch Ansible support needs minimum Firmware version of 16.08.xx', data='')
         else:
             self._module.fail_json(**headers)
 
@@ -272,10 +813,31 @@ class Aossapi:
 
         response, headers = self._send(url, body="", method='DELETE')
         self._cookie = None
+        if self._governor:
+            self._governor.release_session()
 
         if headers['status'] != 204:
             self._module.fail_json(**headers)
 
+    def close(self):
+        '''
+        Ends the module session, if one is open. Failures are ignored as
+        this runs while the module is already exiting.
+        '''
+        if self._cookie:
+            url = self._url + "/login-sessions"
+            try:
+                self._send(url, body="", method='DELETE')
+            except Exception:
+                pass
+            self._cookie = None
+
+        if self._pool:
+            self._pool.close()
+
+        if self._governor:
+            self._governor.release_session()
+
     def run_commands(self, uri, payload={}, method="POST", check=None,wait_after_send=0):
 
         '''
@@ -289,24 +851,29 @@ class Aossapi:
             method = 'POST'
 
         try:
-            self.login()
-
             if check:
-                response = self._validate_request(method, payload, check)
+                response, payload = self._validate_request(method, payload, check)
                 if response:
-                    self.logout()
                     # Configuration change not required
                     return response
 
-            data = self._module.jsonify(payload)
+            if reboot:
+                self._get_cache.clear()
+                # The switch may boot another image
+                self._capabilities = None
+                if not self._connection:
+                    write_host_cache(self._module, capabilities=None)
+            elif method != 'GET':
+                self._invalidate_cache(uri)
 
-            url = self._url + uri
+            data = self._module.jsonify(payload)
 
-            response, headers = self._send(url, body=data, method=method)
+            response, headers = self._request(uri, body=data, method=method)
             sleep(wait_after_send)
 
-            if not reboot:
-                self.logout()
+            if reboot:
+                # Session does not survive the reboot, nothing to log out
+                self._cookie = None
 
             if headers['status'] == 204:
                 return {'msg': 'Successful','changed':True}
@@ -329,69 +896,320 @@ class Aossapi:
         except Exception as err:
             self._module.fail_json(msg='Failed : {}'.format(err),failed=True)
 
-    def get_config(self, uri, check_login=True):
-        ''' Execute a GET operation of device for uri'''
-        url = self._url +  uri
-        headers = {'Content-Type': 'application/json'}
+    def get_config(self, uri, check_login=True, cache=True):
+        '''
+        Execute a GET operation of device for uri. Found and not found
+        results are memoized for the module run unless cache is False,
+        which callers polling a status uri must use.
+        '''
+        cache = cache and check_login
+        if cache and uri in self._get_cache:
+            self._cache_hits += 1
+            return self._get_cache[uri]
 
-        no_login=False
-        if not self._cookie and check_login:
-            no_login=True
-            self.login()
+        if check_login or self._connection:
+            response, headers = self._request(uri, body=None, method='GET')
+        else:
+            start = time()
+            response, headers = fetch_url(self._module, self._url + uri,
+                    headers={'Content-Type': 'application/json'},
+                    method='GET', use_proxy=False)
+            self._record('GET', self._url + uri, None, headers, time() - start)
 
-        if check_login:
-            headers['Cookie'] = self._cookie
+        result = None
+        if headers['status'] == 200:
+            result = response.read()
 
-        response, headers = fetch_url(self._module, url, headers=headers,
-                method='GET', use_proxy=False)
+        if cache and headers['status'] in (200, 404):
+            self._get_cache[uri] = result
 
-        if no_login:
-            self.logout()
+        return result
 
-        if headers['status'] == 200:
-            return response.read()
+    def get_config_json(self, uri):
+        '''
+        Returns the decoded GET response of uri, or None if not found. The
+        decoded response is kept as long as the cached one is valid.
+        '''
+        body = self.get_config(uri)
+        if not body:
+            return None
+        decoded = self._json_cache.get(uri)
+        if decoded is None or decoded[0] is not body:
+            decoded = (body, self._module.from_json(to_text(body)))
+            self._json_cache[uri] = decoded
+        return decoded[1]
+
+    def iter_config(self, uri, element=None, header=None):
+        '''
+        Yields the elements of the collection at uri, decoded as the
+        response is read instead of once the whole body is, see
+        arubaoss_json. The body is not memoized, unless get_config already
+        did, when the elements come from the cached response. Nothing is
+        yielded if the collection is not found. header, if given, gets the
+        counts of collection_result.
+        '''
+        if uri in self._get_cache:
+            decoded = self.get_config_json(uri)
+            if header is not None and decoded:
+                header.update(decoded.get('collection_result') or {})
+            for ele in elements_of(decoded, element):
+                yield ele
+            return
+
+        response, headers = self._request(uri, body=None, method='GET', stream=True)
+        try:
+            if headers['status'] != 200:
+                if headers['status'] == 404:
+                    self._get_cache[uri] = None
+                elif response is not None:
+                    # Read to the end so the connection is kept
+                    response.read()
+                return
+            for ele in iter_elements(response, element, header=header):
+                yield ele
+        finally:
+            # Returns the pooled connection, whatever the status
+            if response is not None:
+                response.close()
+
+    def iter_collection(self, uri, element=None, page_size=None):
+        '''
+        Yields the elements of the collection at uri as iter_config does,
+        requesting them by pages of page_size elements, rest_page_size by
+        default, so that large tables such as ACL rules or the MAC table
+        are neither built by the switch in one response nor held at once.
+        Stopping early skips the pages left. A uri the switch does not
+        page, answering with an error or the whole collection, is read in
+        one request. Paging stops when the switch does not give the total
+        count of the collection, or sends the previous page again.
+        '''
+        if page_size is None:
+            page_size = self._module.params.get('rest_page_size')
+            if page_size is None:
+                page_size = _REST_PAGE_SIZE
+
+        if page_size <= 0 or uri in self._get_cache or uri in self._unpaged:
+            for ele in self.iter_config(uri, element):
+                yield ele
+            return
+
+        separator = '&' if '?' in uri else '?'
+        start = 0
+        previous = None
+        while True:
+            page_uri = uri + separator + _PAGE_QUERY.format(start=start, count=page_size)
+            header = {}
+            count = 0
+            elements = self.iter_config(page_uri, element, header)
+            try:
+                for ele in elements:
+                    if not count:
+                        if start and ele == previous:
+                            # start_index was ignored, this is the first page
+                            return
+                        previous = ele
+                    count += 1
+                    yield ele
+            finally:
+                elements.close()
+
+            if not start and not count and not header:
+                if self._get_cache.get(page_uri, False) is None:
+                    # Not found, whether paged or not
+                    self._get_cache[uri] = None
+                    return
+                # Not a collection response, e.g. the query was refused
+                self._unpaged.add(uri)
+                for ele in self.iter_config(uri, element):
+                    yield ele
+                return
+
+            start += count
+            total = header.get('total_elements_count')
+            if count != page_size or total is None or start >= total:
+                return
+
+    def get_config_bulk(self, uris):
+        '''
+        Executes GET operations for uris concurrently over the pooled
+        connections of the module session. Returns a dict of uri to
+        response body, None for uris not found, and caches them as
+        get_config does.
+        '''
+        result = {}
+        missing = []
+        for uri in set(uris):
+            if uri in self._get_cache:
+                result[uri] = self._get_cache[uri]
+            else:
+                missing.append(uri)
 
-        return None
+        if not missing:
+            return result
+
+        result.update(zip(missing, self.map_bulk(self.get_config, missing)))
+        return result
+
+    def map_bulk(self, func, items):
+        '''
+        Returns [func(item) for item in items], run concurrently over the
+        pooled connections of the module session, logged in beforehand.
+        '''
+        if not self._cookie and not self._connection:
+            self.login()
+
+        workers = min(len(items), self._bulk_workers)
+        if workers <= 1:
+            return [func(item) for item in items]
+
+        # fail_json must not exit a worker thread, which would leave the
+        # pool waiting for it, so the module fails from this thread
+        module = self._module
+        self._module = _BulkModule(module)
+        try:
+            try:
+                return _map_threads(workers, func, items)
+            finally:
+                self._module = module
+        except _BulkFailure as failure:
+            module.fail_json(**failure.result)
+
+    def run_bulk(self, operations):
+        '''
+        Runs a list of operations within the module session and returns
+        the result of each, in order. An operation is a dict with method,
+        uri and optionally payload & check, as taken by run_commands; GET
+        operations return the decoded body, or None if not found.
+
+        The GET uris and checks of all operations are read concurrently
+        before the writes are sent one by one. The operations must target
+        distinct objects, as the checks are evaluated against the state
+        read before any of the writes.
+        '''
+        reads = set()
+        for op in operations:
+            if op.get('method', 'GET') == 'GET':
+                reads.add(op['uri'])
+            elif op.get('check'):
+                reads.add(op['check'])
+        snapshot = self.get_config_bulk(reads)
+
+        results = []
+        for op in operations:
+            method = op.get('method', 'GET')
+            if method == 'GET':
+                body = snapshot[op['uri']]
+                results.append(self._module.from_json(to_text(body)) if body else None)
+                continue
+            if op.get('check'):
+                self._get_cache[op['check']] = snapshot[op['check']]
+            results.append(self.run_commands(op['uri'], op.get('payload', {}),
+                                             method, check=op.get('check')))
+        return results
+
+    def poll(self, uri, done, timeout, check_login=True, progress=None,
+             initial_delay=_POLL_INITIAL_DELAY, max_delay=_POLL_MAX_DELAY):
+        '''
+        Polls the GET of uri until done returns True for its decoded
+        response (None when not found or unreachable), or timeout seconds
+        elapse. The delay between polls doubles up to max_delay, with
+        jitter so that switches polled together spread out. progress, if
+        given, is called with each response. check_login=False polls
+        without the session, e.g. while the switch reboots.
+
+        Returns whether done was reached, the last response and the time
+        spent in seconds.
+        '''
+        start = time()
+        deadline = start + timeout
+        delay = initial_delay
+        while True:
+            body = self.get_config(uri, check_login=check_login, cache=False)
+            value = self._module.from_json(to_text(body)) if body else None
+            if progress:
+                progress(value)
+            if done(value):
+                return True, value, int(time() - start)
+
+            remaining = deadline - time()
+            if remaining <= 0:
+                return False, value, int(time() - start)
+            sleep(min(remaining, random.uniform(delay / 2.0, delay)))
+            delay = min(delay * 2, max_delay)
+
+    def _invalidate_cache(self, uri):
+        ''' Drops cached GET responses of the resource written by uri '''
+        resource = _resource(uri)
+        for cached in list(self._get_cache):
+            if _resource(cached) == resource:
+                del self._get_cache[cached]
 
     def _validate_request(self, method, payload, check):
-        '''Compares value being applied to the configuration present on the device'''
-        check_presence = self.get_config(check)
+        '''
+        Compares value being applied to the configuration present on the
+        device. Returns the response if no change is required, else None
+        and the payload to send, reduced to the patch returned by diff for PUT.
+        '''
+        current = self.get_config_json(check)
         if method == 'DELETE':
-            if not check_presence:
+            if current is None:
                 response = {'changed': False,
                             'failed': False,
                             'msg': 'Not present'}
-                return response
+                return response, payload
         elif method != 'GET':
-            if check_presence:
-                diffkeys = False
-                data = self._module.from_json(to_text(check_presence))
-                for key in payload:
-                    if key in data:
-                        if payload[key] != data[key]:
-                            diffkeys = True
-                            break
-
-                if not diffkeys:
+            if current is not None:
+                patch = diff(payload, current)
+                if not patch:
+                    data = dict(current)
                     data['changed'] = False
                     data['failed'] = False
-                    return data
-        return None
+                    return data, payload
+                if method == 'PUT':
+                    return None, patch
+        return None, payload
+
+    def get_capabilities(self):
+        '''
+        Returns the capabilities of the switch: firmware_version, its
+        firmware_family (e.g. KB), whether it is stacked and the features
+        supported. They are read once and kept in the host cache, except
+        with the persistent connection which has no host to key them by.
+        '''
+        if self._capabilities:
+            return self._capabilities
+
+        if not self._connection:
+            self._capabilities = get_cached_capabilities(self._module)
+            if self._capabilities:
+                return self._capabilities
+
+        # Below REST API does not work on stacked switches, which report
+        # the firmware version in "/system/status/global_info" instead
+        stacked = False
+        status = self.get_config_json("/system/status")
+        if not status or 'firmware_version' not in status:
+            stacked = True
+            status = self.get_config_json("/system/status/global_info")
+        if not status or 'firmware_version' not in status:
+            self._module.fail_json(msg='Unable to get the firmware version of the switch')
+
+        firmware = status['firmware_version']
+        family = firmware[:2]
+        self._capabilities = {
+            'firmware_version': firmware,
+            'firmware_family': family,
+            'stacked': stacked,
+            'features': dict((feature, family not in families)
+                             for feature, families in _UNSUPPORTED_FEATURES.items()),
+        }
+        if not self._connection:
+            write_host_cache(self._module, capabilities=self._capabilities,
+                             capabilities_time=time())
+        return self._capabilities
 
     def get_firmware(self):
-        # Below REST API does not work on stacked switches
-        firmware_url = "/system/status"
-        stacked_firmware_url = "/system/status/global_info"
-        try:
-            check_firmware_version = self.get_config(firmware_url)
-            firmware = self._module.from_json(to_text(check_firmware_version))
-            return firmware['firmware_version']
-        except:
-            # If try block fails then it is a stacked switch, we should be using
-            # "/system/status/global_info" REST API to get the firmware version
-            check_firmware_version = self.get_config(stacked_firmware_url)
-            firmware = self._module.from_json(to_text(check_firmware_version))
-            return firmware['firmware_version']
+        return self.get_capabilities()['firmware_version']
 
 def get_config(module, *args, **kwargs):
     conn = get_connection(module)
@@ -402,6 +1220,279 @@ def run_commands(module, commands, *args, **kwargs):
     conn = get_connection(module)
     return conn.run_commands(commands, *args, **kwargs)
 
+
+def get_config_bulk(module, uris):
+    conn = get_connection(module)
+    return conn.get_config_bulk(uris)
+
+
+def iter_config(module, uri, element=None):
+    conn = get_connection(module)
+    return conn.iter_config(uri, element)
+
+
+def iter_collection(module, uri, element=None, page_size=None):
+    conn = get_connection(module)
+    return conn.iter_collection(uri, element, page_size)
+
+
+def run_bulk(module, operations):
+    conn = get_connection(module)
+    return conn.run_bulk(operations)
+
+
+class _ItemModule:
+    ''' The module as seen by the commands of one aggregate item '''
+
+    def __init__(self, module, params):
+        self._module = module
+        self.params = params
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+def aggregate_items(module):
+    '''
+    Returns the params of each item of the aggregate option, the options
+    an item leaves unset taken from the task. The connection is opened
+    first, so the items get the provider options and the session stays
+    with the module rather than with an item.
+    '''
+    get_connection(module)
+    items = []
+    for item in module.params['aggregate']:
+        params = dict(module.params)
+        params.update((key, value) for key, value in item.items()
+                      if value is not None)
+        items.append(params)
+    return items
+
+
+def item_module(module, params):
+    '''
+    Returns the module to run the commands of an aggregate item with: the
+    params are those of the item, as returned by aggregate_items, the
+    module itself is left untouched
+    '''
+    return _ItemModule(module, params)
+
+
+def poll(module, uri, done, timeout, **kwargs):
+    conn = get_connection(module)
+    return conn.poll(uri, done, timeout, **kwargs)
+
+
+def job_handle(uri, key=None, pending=(), success=None, check_login=True):
+    '''
+    Returns the handle of a long running operation, which a module returns
+    instead of waiting when asked not to, for arubaoss_job to await later.
+    The operation is done when uri answers and, if key is given, its key
+    is no longer one of the pending values. It succeeded if key is then
+    one of the success values.
+    '''
+    return {'uri': uri, 'key': key, 'pending': list(pending),
+            'success': list(success) if success is not None else None,
+            'check_login': check_login, 'started': int(time())}
+
+
+def await_job(module, job, timeout, progress=None):
+    '''
+    Waits for the operation of job, as returned by job_handle. Returns
+    whether it completed, whether it succeeded, its last status and the
+    time waited.
+    '''
+    key = job.get('key')
+
+    def done(value):
+        if value is None:
+            return False
+        return not key or value.get(key) not in job.get('pending', [])
+
+    completed, value, elapsed = poll(module, job['uri'], done, timeout,
+                                     check_login=job.get('check_login', True),
+                                     progress=progress)
+    status = value.get(key) if (value and key) else value
+    success = completed and (not key or job.get('success') is None or
+                             status in job['success'])
+    return completed, success, status, elapsed
+
+
+def _map_threads(workers, func, items):
+    '''
+    Returns [func(item) for item in items], run from a pool of workers
+    threads. The first exception raised by func, SystemExit included, is
+    raised again once every item is done.
+    '''
+    def call(item):
+        try:
+            return None, func(item)
+        except BaseException:
+            return sys.exc_info(), None
+
+    thread_pool = ThreadPool(workers)
+    try:
+        results = thread_pool.map(call, items)
+    finally:
+        thread_pool.close()
+
+    for exc_info, value in results:
+        if exc_info:
+            reraise(*exc_info)
+    return [value for exc_info, value in results]
+
+
+class _BulkFailure(BaseException):
+    ''' Raised by fail_json in a worker thread of Aossapi.map_bulk '''
+
+    def __init__(self, result):
+        super(_BulkFailure, self).__init__(result.get('msg'))
+        self.result = result
+
+
+class _BulkModule:
+    ''' The module as seen by the worker threads of Aossapi.map_bulk '''
+
+    def __init__(self, module):
+        self._module = module
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+    def fail_json(self, **kwargs):
+        raise _BulkFailure(kwargs)
+
+
+class FleetHostFailure(BaseException):
+    '''
+    Raised by fail_json for one switch of a fleet. Like the SystemExit of
+    AnsibleModule.fail_json, it is not caught by the handlers of Aossapi,
+    so it only ends the operations of that switch.
+    '''
+
+    def __init__(self, result):
+        super(FleetHostFailure, self).__init__(result.get('msg'))
+        self.result = result
+
+
+class _FleetHostModule:
+    ''' The module as seen by the Aossapi of one switch of a fleet '''
+
+    def __init__(self, module, params):
+        self._module = module
+        self.params = params
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+    def fail_json(self, **kwargs):
+        raise FleetHostFailure(kwargs)
+
+
+def run_fleet(module, hosts, operations, workers=None):
+    '''
+    Runs operations, as taken by run_bulk, on every switch of hosts at
+    once from a pool of workers threads. Each entry of hosts gives the
+    connection params of a switch (host, port, username...), the others
+    are taken from the module. Every switch gets a session of its own,
+    opened once for all the operations.
+
+    Returns the result of each switch, in the order of hosts.
+    '''
+    load_params(module)
+
+    def run_host(host_params):
+        params = dict(module.params)
+        params.update((key, value) for key, value in host_params.items()
+                      if value is not None)
+        if host_params.get('port') is None and params['use_ssl'] != module.params['use_ssl']:
+            # The port of the task defaults to its own use_ssl
+            params['port'] = 443 if params['use_ssl'] else 80
+        conn = Aossapi(_FleetHostModule(module, params))
+        result = {'host': params['host'], 'port': params['port']}
+        try:
+            conn.load_api_version()
+            results = conn.run_bulk(operations)
+            result['changed'] = any(isinstance(ret, dict) and ret.get('changed', False)
+                                    for ret in results)
+            result['failed'] = any(isinstance(ret, dict) and ret.get('failed', False)
+                                   for ret in results)
+            result['results'] = results
+        except FleetHostFailure as failure:
+            result.update(failure.result)
+            result['failed'] = True
+        except Exception as err:
+            result.update(failed=True, msg=to_text(err))
+        finally:
+            conn.close()
+            if conn.perf_enabled():
+                result['perf'] = conn.perf_summary()
+            if conn.retried():
+                result['rest_retries'] = conn.retried()
+        return result
+
+    workers = min(workers or _FLEET_WORKERS, len(hosts))
+    if workers <= 1:
+        return [run_host(host) for host in hosts]
+
+    return _map_threads(workers, run_host, hosts)
+
+
+def get_collections(module, collections):
+    '''
+    Reads whole collections, e.g. /vlans, with one GET each and indexes
+    their elements as they are decoded. collections is a dict of uri to
+    (element, key) where element is the list key of the response, e.g.
+    vlan_element, and key returns the id of an element. Returns a dict of
+    uri to index, empty when the collection is not found.
+    '''
+    conn = get_connection(module)
+    uris = list(collections)
+
+    def index(uri):
+        element, key = collections[uri]
+        return dict((key(ele), ele) for ele in conn.iter_collection(uri, element))
+
+    return dict(zip(uris, conn.map_bulk(index, uris)))
+
+
+def reconcile(current, desired, state, in_scope=None):
+    '''
+    Diffs the desired objects against the current ones and returns the
+    ids to create, the (id, fields) to update and the ids to delete.
+
+    current is an index as returned by get_collections and desired a
+    list of (id, fields). Only the fields of a desired object are
+    compared, so for merged the caller gives the fields set by the user
+    and for replaced & overridden every field. replaced also deletes the
+    objects not desired which in_scope accepts, overridden all of them.
+    '''
+    create = []
+    update = []
+    wanted = set()
+    for obj_id, fields in desired:
+        if obj_id in wanted:
+            continue
+        wanted.add(obj_id)
+        if obj_id not in current:
+            create.append(obj_id)
+            continue
+        changed = dict((key, value) for key, value in fields.items()
+                       if not is_equal(value, current[obj_id].get(key)))
+        if changed:
+            update.append((obj_id, changed))
+
+    delete = []
+    if state in ('replaced', 'overridden'):
+        for obj_id in sorted(current, key=str):
+            if obj_id in wanted:
+                continue
+            if state == 'overridden' or (in_scope and in_scope(current[obj_id])):
+                delete.append(obj_id)
+
+    return create, update, delete
+
+
 def run_cli_commands(module, commands, check_rc=False):
     conn = get_connection(module, True)
     try:
@@ -409,43 +1500,86 @@ def run_cli_commands(module, commands, check_rc=False):
     except ConnectionError as exc:
         module.fail_json(msg=to_text(exc))
 
+def get_capabilities(module):
+    conn = get_connection(module)
+    return conn.get_capabilities()
+
+
+def has_feature(module, feature):
+    ''' Whether the switch supports feature, one of _UNSUPPORTED_FEATURES '''
+    return get_capabilities(module)['features'].get(feature, True)
+
+
 def get_firmware(module):
     conn = get_connection(module)
     return conn.get_firmware()
 
 def get_cli_config(module, flags=None):
     '''
-    Obtains the switch configuration
+    Obtains the switch configuration, read once per task until load_config
+    configures the switch
     '''
     flags = [] if flags is None else flags
-
-    cmd = 'show running-config '
-    cmd += ' '.join(flags)
-    cmd = cmd.strip()
+    key = ' '.join(flags)
 
     try:
-        return _DEVICE_CONFIGS[cmd]
+        return _DEVICE_CONFIGS[key]
     except KeyError:
-        rc, out, err = exec_command(module, cmd)
-        if rc != 0:
-            module.fail_json(msg='unable to retrieve current config', stderr=to_text(err, errors='surrogate_then_replace'))
+        conn = get_connection(module, True)
+        try:
+            out = conn.get_config(flags=flags)
+        except ConnectionError as exc:
+            module.fail_json(msg='unable to retrieve current config', stderr=to_text(exc, errors='surrogate_then_replace'))
         cfg = to_text(out, errors='surrogate_then_replace').strip()
-        _DEVICE_CONFIGS[cmd] = cfg
+        _DEVICE_CONFIGS[key] = cfg
         return cfg
 
-def load_config(module, commands):
+def get_cli_config_section(module, section):
     '''
-    Loads the configuration onto the switch
+    Obtains the running-config of a section of the switch, e.g. vlan 45 or
+    interface 1/A1, with show running-config <section>. Returns None when
+    the switch cannot show the section.
     '''
-    rc, out, err = exec_command(module, 'configure terminal')
-    if rc != 0:
-        module.fail_json(msg='unable to enter configuration mode', err=to_text(out, errors='surrogate_then_replace'))
+    conn = get_connection(module, True)
+    try:
+        out = conn.get_config(flags=[section])
+    except ConnectionError:
+        return None
+    return to_text(out, errors='surrogate_then_replace').strip()
 
-    for command in to_list(commands):
-        if command == 'end':
-            continue
-        rc, out, err = exec_command(module, command)
-        if rc != 0:
-            module.fail_json(msg=to_text(err, errors='surrogate_then_replace'), command=command, rc=rc)
+def has_unsaved_config(module):
+    '''
+    Whether the running-config of the switch changed since it was saved,
+    from show config status. None when the switch does not tell.
+    '''
+    conn = get_connection(module, True)
+    try:
+        out = to_text(conn.get('show config status'), errors='surrogate_then_replace')
+    except ConnectionError:
+        return None
+    if re.search(r'has been changed|needs to be saved', out, re.I):
+        return True
+    if re.search(r'is (the )?same as', out, re.I):
+        return False
+    return None
+
+def load_config(module, commands, batch_size=1):
+    '''
+    Loads the configuration onto the switch, through the cliconf plugin
+    batch_size commands at a time before reading their output. Commands
+    of the block of one which failed have been sent.
+    '''
+    commands = [command for command in to_list(commands) if command != 'end']
+
+    _DEVICE_CONFIGS.clear()
+    conn = get_connection(module, True)
+    try:
+        result = conn.edit_config(commands, batch_size=batch_size)
+    except ConnectionError as exc:
+        module.fail_json(msg=to_text(exc, errors='surrogate_then_replace'))
 
-    exec_command(module, 'end')
\ No newline at end of file
+    error = result['error']
+    if error:
+        module.fail_json(msg=error['msg'], command=error['command'], line=error['index'] + 1,
+                         rc=1)
+    return result['response']
\ No newline at end of file
@@ -0,0 +1,243 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign their own license
+# to the complete work.
+#
+# (C) Copyright 2020 Hewlett Packard Enterprise Development LP.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+'''
+Parses the CLI configuration of AOS-Switch into a tree indexed by the
+path of each line, to diff a candidate against the running-config in one
+pass over the candidate, and digests configurations without parsing them.
+'''
+
+import hashlib
+import re
+from io import StringIO
+
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.network.common.config import NetworkConfig, ignore_line
+
+# Lines which are not configuration: the header of show running-config &
+# show config, comments and the exit closing a context
+_NOT_CONFIG_RE = re.compile(r'^((Running|Startup|Current) configuration:|;|exit$)')
+_ENTRY_RE = re.compile(r'([{};])')
+
+
+def _compile(ignore_lines):
+    return [item if hasattr(item, 'match') else re.compile(item)
+            for item in ignore_lines or []]
+
+
+def _ignored(text, ignore_lines):
+    return any(regex.match(text) for regex in ignore_lines)
+
+
+def config_lines(contents, ignore_lines=None):
+    '''
+    Yields the lines of contents which are configuration, i.e. the lines
+    ConfigTree keeps, without those matching ignore_lines
+    '''
+    ignore_lines = _compile(ignore_lines)
+    for line in StringIO(to_text(contents, errors='surrogate_or_strict')):
+        line = line.rstrip('\n')
+        text = line.strip()
+        entry = _ENTRY_RE.sub('', line).strip()
+        if not entry or ignore_line(entry) or _NOT_CONFIG_RE.match(text) \
+                or _ignored(text, ignore_lines):
+            continue
+        yield line
+
+
+def _digest(lines):
+    sha1 = hashlib.sha1()
+    for line in lines:
+        sha1.update(to_bytes(line.rstrip() + '\n', errors='surrogate_or_strict'))
+    return sha1.digest()
+
+
+def config_digest(contents, ignore_lines=None):
+    '''
+    Digest of the configuration in contents, in one pass over its lines.
+    Equal to the digest of the ConfigTree of contents, and for configs
+    differing only by whitespace at the end of lines.
+    '''
+    return _digest(config_lines(contents, ignore_lines))
+
+
+def config_text(contents, ignore_lines=None):
+    ''' The configuration in contents, without the lines matching ignore_lines '''
+    return '\n'.join(config_lines(contents, ignore_lines))
+
+
+class ConfigTree(NetworkConfig):
+    '''
+    NetworkConfig of an AOS-Switch. Lines are indexed by their path, the
+    parents and the line, and each top level block has the digest of its
+    lines, so difference looks a line up instead of scanning the other
+    config, and skips the blocks the other config has unchanged. Blocks
+    whose first line is repeated, e.g. a context entered twice, have no
+    digest and are always diffed line by line.
+
+    ignore_lines only apply to this config, not to every config parsed
+    afterwards as with NetworkConfig, and digest & text can filter more
+    lines without parsing the config again.
+    '''
+
+    def __init__(self, indent=3, contents=None, ignore_lines=None):
+        self._ignore_lines = _compile(ignore_lines)
+        self._index = {}
+        self._digests = {}
+        self._sha1 = None
+        super(ConfigTree, self).__init__(indent=indent, contents=contents)
+
+    def parse(self, lines, comment_tokens=None):
+        kept = '\n'.join(config_lines(lines, self._ignore_lines))
+        return super(ConfigTree, self).parse(kept, comment_tokens)
+
+    def load(self, s):
+        super(ConfigTree, self).load(s)
+        self._build_index()
+
+    def add(self, lines, parents=None):
+        super(ConfigTree, self).add(lines, parents)
+        self._build_index()
+
+    def _build_index(self):
+        self._index = {}
+        self._digests = {}
+        self._sha1 = None
+
+        block = None
+        for item in self._items:
+            line = item.line
+            self._index.setdefault(line, item)
+            if not item.has_parents:
+                if block is not None:
+                    self._add_digest(*block)
+                block = (line, hashlib.sha1())
+            block[1].update(to_bytes(line + '\n', errors='surrogate_or_strict'))
+        if block is not None:
+            self._add_digest(*block)
+
+    def _add_digest(self, line, sha1):
+        # None for a repeated block, which a single digest cannot describe
+        self._digests[line] = None if line in self._digests else sha1.digest()
+
+    def __contains__(self, line):
+        return getattr(line, 'line', line) in self._index
+
+    def get_object(self, path):
+        item = self._index.get(' '.join(path))
+        if item is not None and item.text == path[-1] and item.parents == path[:-1]:
+            return item
+        return super(ConfigTree, self).get_object(path)
+
+    def block_digest(self, line):
+        ''' Digest of the top level block starting with line, None if absent or repeated '''
+        return self._digests.get(line)
+
+    def _lines(self, ignore_lines=None):
+        ignore_lines = _compile(ignore_lines)
+        return [item.raw for item in self._items
+                if not _ignored(item.text, ignore_lines)]
+
+    def text(self, ignore_lines=None):
+        ''' The config without the lines matching ignore_lines '''
+        return '\n'.join(self._lines(ignore_lines))
+
+    def digest(self, ignore_lines=None):
+        ''' config_digest of the config without the lines matching ignore_lines '''
+        return _digest(self._lines(ignore_lines))
+
+    @property
+    def sha1(self):
+        if self._sha1 is None:
+            self._sha1 = super(ConfigTree, self).sha1
+        return self._sha1
+
+    def _diff_line(self, other):
+        if not isinstance(other, ConfigTree):
+            lines = set(item.line for item in other)
+            return [item for item in self.items if item.line not in lines]
+
+        updates = []
+        skip = False
+        for item in self.items:
+            if not item.has_parents:
+                digest = self._digests.get(item.line)
+                skip = digest is not None and digest == other.block_digest(item.line)
+            if not skip and item.line not in other:
+                updates.append(item)
+        return updates
+
+    def _expand_block(self, configobj, S=None):
+        if S is None:
+            S = []
+        seen = set(id(item) for item in S)
+        stack = [configobj]
+        while stack:
+            item = stack.pop()
+            if id(item) in seen:
+                continue
+            seen.add(id(item))
+            S.append(item)
+            stack.extend(reversed(item._children))
+        return S
+
+    def difference(self, other, match='line', path=None, replace=None):
+        '''
+        Lines of this config missing from other, as NetworkConfig.difference.
+        With match line, other is kept a ConfigTree so its index is used.
+        '''
+        if match != 'line':
+            return super(ConfigTree, self).difference(other, match=match, path=path,
+                                                      replace=replace)
+
+        updates = self._diff_line(other)
+
+        # Items are told apart by identity, not by line, so that the lines
+        # of a context entered twice are each sent under their own parent
+        if replace == 'block':
+            parents = []
+            seen = set()
+            for item in updates:
+                for parent in (item._parents or [item])[:1]:
+                    if id(parent) not in seen:
+                        seen.add(id(parent))
+                        parents.append(parent)
+            updates = []
+            for item in parents:
+                updates.extend(self._expand_block(item))
+
+        visited = set()
+        expanded = []
+        for item in updates:
+            for parent in item._parents:
+                if id(parent) not in visited:
+                    visited.add(id(parent))
+                    expanded.append(parent)
+            if id(item) not in visited:
+                visited.add(id(item))
+                expanded.append(item)
+        return expanded
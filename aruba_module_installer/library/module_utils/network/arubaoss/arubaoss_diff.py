@@ -0,0 +1,105 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign their own license
+# to the complete work.
+#
+# (C) Copyright 2020 Hewlett Packard Enterprise Development LP.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+'''
+Compares REST payloads to the configuration returned by the switch.
+
+The switch returns more than it is sent: read-only fields such as uri,
+fields left at their defaults and list elements decorated with extra
+keys. Only what the payload sets is compared, dicts recursively, lists
+regardless of order, and numbers sent as strings (or the reverse) are
+compared by value.
+'''
+
+from ansible.module_utils.six import string_types, integer_types
+
+
+def _is_number(value):
+    return isinstance(value, integer_types + (float,)) and not isinstance(value, bool)
+
+
+def is_equal(desired, current):
+    '''
+    Returns whether current, as read from the switch, already holds
+    desired. Keys of a desired dict missing from the current one are not
+    compared, as the switch omits the fields it does not report.
+    '''
+    if isinstance(desired, dict):
+        if not isinstance(current, dict):
+            return False
+        for key, value in desired.items():
+            if key in current and not is_equal(value, current[key]):
+                return False
+        return True
+
+    if isinstance(desired, (list, tuple)):
+        if not isinstance(current, (list, tuple)) or len(desired) != len(current):
+            return False
+        # Order insensitive, each current element matches one desired
+        remaining = list(current)
+        for value in desired:
+            for index, candidate in enumerate(remaining):
+                if is_equal(value, candidate):
+                    del remaining[index]
+                    break
+            else:
+                return False
+        return True
+
+    if isinstance(desired, bool) or isinstance(current, bool):
+        return type(desired) == type(current) and desired == current
+
+    if _is_number(desired) and isinstance(current, string_types) or \
+            isinstance(desired, string_types) and _is_number(current):
+        return str(desired) == str(current)
+
+    return desired == current
+
+
+def is_identifier(key):
+    ''' Whether the payload key names the object, e.g. id or vlan_id '''
+    return key == 'id' or key.endswith('_id')
+
+
+def diff(desired, current):
+    '''
+    Returns the minimal patch of the desired payload against current:
+    the top level keys whose value differs, along with the keys missing
+    from current and the identifier keys of the payload, or an empty dict
+    when nothing differs. Missing keys alone are no difference, as for
+    is_equal. Nested values are sent whole as the switch does not merge
+    them.
+    '''
+    if not isinstance(current, dict):
+        return dict(desired)
+
+    patch = dict((key, value) for key, value in desired.items()
+                 if key in current and not is_equal(value, current[key]))
+    if patch:
+        patch.update((key, value) for key, value in desired.items()
+                     if key not in current or is_identifier(key))
+    return patch
@@ -0,0 +1,138 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign their own license
+# to the complete work.
+#
+# (C) Copyright 2020 Hewlett Packard Enterprise Development LP.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+'''
+Limits the load the module processes of a controller put on one switch.
+
+Every fork runs its own module process, so a switch targeted by many
+forks at once (delegate_to, async loops, several plays) may run out of
+REST sessions or have its management CPU saturated. The governor caps,
+across all processes, the sessions open on a switch and the rate of
+requests sent to it, through lock files next to the host cache. Locks
+held with flock are released by the system when a process dies, so a
+crashed module never keeps a session slot.
+
+Not available where fcntl is not, e.g. on Windows controllers.
+'''
+
+import os
+import random
+from time import sleep, time
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+_SLOT_WAIT_INITIAL = 0.1
+_SLOT_WAIT_MAX = 2
+
+
+class GovernorTimeout(Exception):
+    pass
+
+
+class Governor:
+    '''
+    Governs the requests to the switch whose lock files are named from
+    prefix. At most max_sessions REST sessions are open at once and at
+    most requests_per_second requests sent per second, with bursts of
+    up to one second of requests; 0 disables either limit.
+    '''
+
+    def __init__(self, prefix, max_sessions=0, requests_per_second=0, timeout=600):
+        self._prefix = prefix
+        self._max_sessions = max_sessions or 0
+        self._interval = 1.0 / requests_per_second if requests_per_second else 0
+        self._timeout = timeout
+        self._slot = None
+        directory = os.path.dirname(prefix)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+
+    def _open(self, suffix):
+        return os.open(self._prefix + suffix, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def acquire_session(self):
+        '''
+        Takes one of the session slots of the switch, waiting for another
+        process to release one. Raises GovernorTimeout after timeout.
+        '''
+        if not self._max_sessions or self._slot is not None:
+            return
+
+        deadline = time() + self._timeout
+        delay = _SLOT_WAIT_INITIAL
+        while True:
+            for index in random.sample(range(self._max_sessions), self._max_sessions):
+                fd = self._open('.session{}'.format(index))
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except (IOError, OSError):
+                    os.close(fd)
+                    continue
+                self._slot = fd
+                return
+            if time() >= deadline:
+                raise GovernorTimeout('No REST session slot of the switch freed within {} seconds'
+                                      .format(self._timeout))
+            sleep(min(random.uniform(delay / 2, delay), max(deadline - time(), 0)))
+            delay = min(delay * 2, _SLOT_WAIT_MAX)
+
+    def release_session(self):
+        if self._slot is not None:
+            fd, self._slot = self._slot, None
+            os.close(fd)
+
+    def throttle(self):
+        '''
+        Waits for the turn of a request to the switch. The time the next
+        request may be sent is shared by all processes in a file, each
+        request reserving its turn and pushing it by 1/rate seconds.
+        '''
+        if not self._interval:
+            return
+
+        fd = self._open('.rate')
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                next_time = float(os.read(fd, 64) or 0)
+            except ValueError:
+                next_time = 0
+            now = time()
+            # Requests up to one second ahead are sent at once, as a burst
+            turn = max(next_time - 1 + self._interval, now)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, repr(max(next_time, now) + self._interval).encode())
+        finally:
+            os.close(fd)
+
+        if turn > now:
+            sleep(turn - now)
@@ -0,0 +1,128 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign their own license
+# to the complete work.
+#
+# (C) Copyright 2020 Hewlett Packard Enterprise Development LP.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+'''
+Decodes the element list of a REST collection as it is read.
+
+Collections such as /vlans-ports or /mac-table of a populated chassis are
+several megabytes. Rather than reading the whole body and decoding it at
+once, the elements of the "<name>_element" list are decoded one at a time
+from a buffer of a few chunks, so callers can index or filter them while
+the rest of the body is still arriving and never hold the body whole.
+'''
+
+import codecs
+import json
+import re
+
+from ansible.module_utils.six import integer_types
+
+_CHUNK_SIZE = 65536
+
+# The keys of a collection, e.g. collection_result, are short and come
+# before the element list. Keep enough of the tail to match a split key.
+_KEY_TAIL = 256
+
+_ANY_ELEMENT_RE = re.compile(r'"(\w+_element)"\s*:\s*\[')
+_SEPARATOR_RE = re.compile(r'[\s,]*')
+_COUNT_RE = re.compile(r'"(\w+)"\s*:\s*(\d+)\s*[,}]')
+# What may follow the part of a number decoded so far, up to the buffer end
+_NUMBER_TAIL_RE = re.compile(r'[\d.eE+-]*\Z')
+
+
+def elements_of(decoded, element=None):
+    ''' Returns the element list of a decoded collection, [] if none '''
+    if not isinstance(decoded, dict):
+        return []
+    if element:
+        return decoded.get(element) or []
+    for key, value in decoded.items():
+        if key.endswith('_element') and isinstance(value, list):
+            return value
+    return []
+
+
+def iter_elements(stream, element=None, chunk_size=_CHUNK_SIZE, header=None):
+    '''
+    Yields the elements of the collection read from stream, a file like
+    object of the UTF-8 response body, as each one is complete. element
+    is the list key, e.g. vlan_port_element, or the first key ending in
+    _element when None. Nothing is yielded if the body has no such list.
+    Raises ValueError if the body ends within the list. If header is a
+    dict, the counts found before the list, e.g. total_elements_count of
+    collection_result, are set in it.
+    '''
+    if element:
+        key_re = re.compile(r'"{}"\s*:\s*\['.format(re.escape(element)))
+    else:
+        key_re = _ANY_ELEMENT_RE
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+
+    buf = u''
+    eof = False
+    while True:
+        match = key_re.search(buf)
+        if header is not None:
+            prefix = buf[:match.start()] if match else buf
+            header.update((key, int(count)) for key, count in _COUNT_RE.findall(prefix))
+        if match:
+            break
+        if eof:
+            return
+        buf = buf[-_KEY_TAIL:]
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buf += utf8.decode(chunk or b'', eof)
+
+    pos = match.end()
+    while True:
+        pos = _SEPARATOR_RE.match(buf, pos).end()
+        if pos < len(buf):
+            if buf[pos] == ']':
+                return
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                end = None
+            # A number ending with the buffer, or followed by the start of
+            # its fraction or exponent, e.g. 5. of 5.5, may go on
+            if end is not None and not eof and isinstance(value, integer_types + (float,)) \
+                    and not isinstance(value, bool) and _NUMBER_TAIL_RE.match(buf, end):
+                end = None
+            if end is not None and (end < len(buf) or eof):
+                yield value
+                pos = end
+                continue
+        if eof:
+            raise ValueError('Incomplete JSON list {}'.format(match.group(0)))
+        # Only the element being decoded is kept
+        buf = buf[pos:]
+        pos = 0
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buf += utf8.decode(chunk or b'', eof)
@@ -272,7 +272,7 @@ message:
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.network.arubaoss.arubaoss import run_commands,get_config
+from ansible.module_utils.network.arubaoss.arubaoss import run_commands,get_config,iter_collection
 from ansible.module_utils.network.arubaoss.arubaoss import arubaoss_argument_spec
 from ansible.module_utils._text import to_text
 
@@ -343,83 +343,75 @@ def check_acl_rule_exists(module):
     acl_id = params['acl_name'] + '~' + params['acl_type']
     url = '/acls/' + acl_id + '/rules'
 
-    acl_rule = get_config(module, url)
-    if acl_rule:
-        check_config = module.from_json(to_text(acl_rule))
-
-        if check_config['collection_result']['total_elements_count'] == 0:
-            return result
+    for ele in iter_collection(module, url, 'acl_rule_element'):
+        if ele['acl_action'] != params['acl_action']:
+            continue
+        if params['acl_type'] == 'AT_EXTENDED_IPV4':
+            protocol_type = ele['traffic_match']['protocol_type']
+            source_ip_address = ele['traffic_match']['source_ip_address']['octets']
+            source_ip_mask = ele['traffic_match']['source_ip_mask']['octets']
+            destination_ip_address = ele['traffic_match']['destination_ip_address']['octets']
+            destination_ip_mask = ele['traffic_match']['destination_ip_mask']['octets']
+
+            if protocol_type != params['protocol_type'] or \
+                source_ip_address != params['source_ip_address'] or \
+                source_ip_mask != params['source_ip_mask'] or \
+                destination_ip_address != params['destination_ip_address'] or \
+                destination_ip_mask != params['destination_ip_mask']:
+                    continue
 
-        for ele in check_config['acl_rule_element']:
-            if ele['acl_action'] != params['acl_action']:
-                continue
-            if params['acl_type'] == 'AT_EXTENDED_IPV4':
-                print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-                protocol_type = ele['traffic_match']['protocol_type']
-                source_ip_address = ele['traffic_match']['source_ip_address']['octets']
-                source_ip_mask = ele['traffic_match']['source_ip_mask']['octets']
-                destination_ip_address = ele['traffic_match']['destination_ip_address']['octets']
-                destination_ip_mask = ele['traffic_match']['destination_ip_mask']['octets']
-
-                if protocol_type != params['protocol_type'] or \
-                    source_ip_address != params['source_ip_address'] or \
-                    source_ip_mask != params['source_ip_mask'] or \
-                    destination_ip_address != params['destination_ip_address'] or \
-                    destination_ip_mask != params['destination_ip_mask']:
+            if params['protocol_type'] == 'PT_ICMP':
+                if params['icmp_type'] > -1 and ele['traffic_match']['icmp_type']:
+                    if ele['traffic_match']['icmp_type'] != params['icmp_type']:
                         continue
-
-                if params['protocol_type'] == 'PT_ICMP':
-                    if params['icmp_type'] > -1 and ele['traffic_match']['icmp_type']:
-                        if ele['traffic_match']['icmp_type'] != params['icmp_type']:
-                            continue
-                    if params['icmp_code'] > -1 and ele['traffic_match']['icmp_code']:
-                        if ele['traffic_match']['icmp_code'] != params['icmp_code']:
-                            continue
-                elif params['protocol_type'] == 'PT_IGMP':
-                    if params['igmp_type'] and ele['traffic_match']['igmp_type']:
-                        if ele['traffic_match']['igmp_type'] != params['igmp_type']:
-                            continue
-                elif params['protocol_type'] == 'PT_TCP':
-                    if params['is_connection_established'] and ele['traffic_match']['is_connection_established']:
-                        if ele['traffic_match']['is_connection_established'] != params['is_connection_established']:
-                            continue
-                    if params['match_bit'] and ele['traffic_match']['match_bit']:
-                        if ele['traffic_match']['match_bit'] != params['match_bit']:
-                            continue
-                elif params['protocol_type'] in ('PT_SCTP','PT_TCP','PT_UDP'):
-                    if params['source_port'] and ele['traffic_match']['source_port']:
-                        if ele['traffic_match']['source_port'] != params['source_port']:
-                            continue
-                    if params['destination_port'] and ele['traffic_match']['destination_port']:
-                        if ele['traffic_match']['destination_port'] != params['destination_port']:
-                            continue
-                if params['precedence'] and ele['traffic_match']['precedence']:
-                    if ele['traffic_match']['precedence'] != params['precedence']:
+                if params['icmp_code'] > -1 and ele['traffic_match']['icmp_code']:
+                    if ele['traffic_match']['icmp_code'] != params['icmp_code']:
                         continue
-
-                if params['tos'] and ele['traffic_match']['tos']:
-                    if ele['traffic_match']['tos'] != params['tos']:
+            elif params['protocol_type'] == 'PT_IGMP':
+                if params['igmp_type'] and ele['traffic_match']['igmp_type']:
+                    if ele['traffic_match']['igmp_type'] != params['igmp_type']:
                         continue
-                if params['is_log'] is not None and ele['is_log']:
-                    if ele['is_log'] != params['is_log']:
+            elif params['protocol_type'] == 'PT_TCP':
+                if params['is_connection_established'] and ele['traffic_match']['is_connection_established']:
+                    if ele['traffic_match']['is_connection_established'] != params['is_connection_established']:
                         continue
+                if params['match_bit'] and ele['traffic_match']['match_bit']:
+                    if ele['traffic_match']['match_bit'] != params['match_bit']:
+                        continue
+            elif params['protocol_type'] in ('PT_SCTP','PT_TCP','PT_UDP'):
+                if params['source_port'] and ele['traffic_match']['source_port']:
+                    if ele['traffic_match']['source_port'] != params['source_port']:
+                        continue
+                if params['destination_port'] and ele['traffic_match']['destination_port']:
+                    if ele['traffic_match']['destination_port'] != params['destination_port']:
+                        continue
+            if params['precedence'] and ele['traffic_match']['precedence']:
+                if ele['traffic_match']['precedence'] != params['precedence']:
+                    continue
 
-            else:
-
-                if params['acl_source_address'] == 'host':
-                    source_ip_mask = '255.255.255.255'
-                    source_ip_address = '0.0.0.0'
-                else:
-                    source_ip_address = params['acl_source_address']
-                    source_ip_mask = params['acl_source_mask']
-
-                if source_ip_address != ele['std_source_address']['source_ip_address']['octets']:
+            if params['tos'] and ele['traffic_match']['tos']:
+                if ele['traffic_match']['tos'] != params['tos']:
                     continue
-                if source_ip_mask != ele['std_source_address']['source_ip_mask']['octets']:
+            if params['is_log'] is not None and ele['is_log']:
+                if ele['is_log'] != params['is_log']:
                     continue
 
-            #Return True as we checked all values found to be matching.
-            return True
+        else:
+
+            if params['acl_source_address'] == 'host':
+                source_ip_mask = '255.255.255.255'
+                source_ip_address = '0.0.0.0'
+            else:
+                source_ip_address = params['acl_source_address']
+                source_ip_mask = params['acl_source_mask']
+
+            if source_ip_address != ele['std_source_address']['source_ip_address']['octets']:
+                continue
+            if source_ip_mask != ele['std_source_address']['source_ip_mask']['octets']:
+                continue
+
+        #Return True as we checked all values found to be matching.
+        return True
 
     #End of for loop, Searched all entries no match found.
     return result
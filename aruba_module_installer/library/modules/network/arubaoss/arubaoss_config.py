@@ -35,7 +35,10 @@ options:
   parents:
     description:
       - Parent lines that identify the configuration section or context under which the
-        "lines" lines should be checked and/or placed. 
+        "lines" lines should be checked and/or placed. When the first parent is a single 
+        "vlan" or "interface" context, only that context of the running-config is read from 
+        the device to be matched against, unless the full running-config is needed for "backup" 
+        or "diff_against: running".
     required: False
     type: list
   src:
@@ -120,6 +123,17 @@ options:
     aliases: ['config']
     required: False
     type: str
+  batch_size:
+    description:
+      - Number of commands written to the device at once before their output is read. The device 
+        runs a block of commands without waiting for a round trip after each, which speeds up 
+        large configs such as a "src" file. A block ends after a command entering a context, 
+        e.g. "vlan 10", so the commands of the context are only sent once it was entered. If a 
+        command fails, the commands following it in its block have been sent too, and the task 
+        fails with the failed command and its line. By default the commands are sent one at a time.
+    default: 1
+    required: False
+    type: int
   save_when:
     description:
       - Specifies when to copy the running-config to the startup-config. When changes are made to 
@@ -128,7 +142,7 @@ options:
         startup-config.
         If "save_when" is set to "never," the running-config will never be copied to startup-config.
         If "save_when" is set to "modified," the running-config will be copied to startup-config 
-        if the two differ.
+        if the two differ. Neither is read when "show config status" reports no unsaved change.
         If "save_when" is set to "changed," the running-config will be copied to startup-config 
         if the task modified the running-config.
     default: never
@@ -209,13 +223,34 @@ EXAMPLES = '''
 
 RETURN = r''' # '''
 
+import re
+
 from ansible.module_utils.network.arubaoss.arubaoss import load_config
 from ansible.module_utils.network.arubaoss.arubaoss import run_cli_commands as run_commands  # NOQA
 from ansible.module_utils.network.arubaoss.arubaoss import arubaoss_argument_spec  # NOQA
 from ansible.module_utils.network.arubaoss.arubaoss import get_cli_config as get_config  # NOQA
+from ansible.module_utils.network.arubaoss.arubaoss import get_cli_config_section, has_unsaved_config
 from ansible.module_utils.network.arubaoss.arubaoss import check_args as arubaoss_check_args  # NOQA
+from ansible.module_utils.network.arubaoss.arubaoss_config_tree import ConfigTree, config_digest, config_text
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.network.common.config import NetworkConfig, dumps
+from ansible.module_utils.network.common.config import dumps
+
+# Contexts the switch shows alone with show running-config <context>
+_SECTION_RE = re.compile(r'^(vlan \d+|interface [^\s,-]+)$')
+
+
+def get_section(module):
+    '''
+    Returns the context holding all the lines of the task, when the switch
+    can show it alone, e.g. vlan 45 for parents vlan 45
+    '''
+    parents = module.params['parents']
+    if not parents or not module.params['lines']:
+        return None
+    section = ' '.join(parents[0].split())
+    if _SECTION_RE.match(section):
+        return section
+    return None
 
 
 def get_running_config(module, config=None):
@@ -225,17 +260,16 @@ def get_running_config(module, config=None):
     contents = module.params['running_config']
     if not contents:
         if config:
-            contents = config
-        else:
-            contents = get_config(module)
-    return NetworkConfig(contents=contents)
+            return config
+        contents = get_config(module)
+    return ConfigTree(contents=contents)
 
 
 def get_candidate(module):
     '''
     Gets config candidate
     '''
-    candidate = NetworkConfig()
+    candidate = ConfigTree()
 
     if module.params['src']:
         candidate.loadfp(module.params['src'])
@@ -284,6 +318,8 @@ def main():
         backup=dict(type='bool', default=False),
         backup_options=dict(type='dict', options=backup_spec),
 
+        batch_size=dict(type='int', default=1),
+
         save_when=dict(choices=['always', 'never', 'modified', 'changed'],
                        default='never'),
 
@@ -311,6 +347,8 @@ def main():
     result = {'changed': False, 'warnings': warnings}
 
     config = None
+    loaded = False
+    partial = False
 
     if module.params['diff_against'] is not None:
         module._diff = True
@@ -318,7 +356,7 @@ def main():
     if module.params['backup'] or (module._diff and
                                    module.params['diff_against'] == 'running'):
         contents = get_config(module)
-        config = NetworkConfig(contents=contents)
+        config = ConfigTree(contents=contents)
         if module.params['backup']:
             result['__backup__'] = contents
             result['backup_options'] = module.params['backup_options']
@@ -343,6 +381,16 @@ def main():
         candidate = get_candidate(module)
 
         if match != 'none':
+            # Only the context of the lines is read when it is all the
+            # diff needs
+            section = None
+            if config is None and not module.params['running_config']:
+                section = get_section(module)
+            if section:
+                contents = get_cli_config_section(module, section)
+                if contents is not None:
+                    config = ConfigTree(contents=contents)
+                    partial = True
             config = get_running_config(module, config)
             path = module.params['parents']
             configobjs = candidate.difference(
@@ -363,7 +411,8 @@ def main():
             result['updates'] = commands
 
             if not module.check_mode:
-                load_config(module, commands)
+                load_config(module, commands, module.params['batch_size'])
+                loaded = True
 
             result['changed'] = True
 
@@ -377,61 +426,57 @@ def main():
     diff_ignore_lines.append("Current configuration:")
     diff_ignore_lines.append("Startup configuration:")
 
+    # The configs are compared by digest, each read & digested once for
+    # save_when and the diff. The running-config read before the task
+    # still applies if the task did not change the switch.
+    if config is not None and not (loaded or partial or module.params['running_config']):
+        running_config = config.config_text
+    running_digest = None
+
     if module.params['save_when'] == 'always':
         save_config(module, result)
     elif module.params['save_when'] == 'modified':
-        output = run_commands(module,
-                              ['show running-config', 'show config config'])
-
-        running_config = NetworkConfig(
-            contents=output[0], ignore_lines=diff_ignore_lines)
-        startup_config = NetworkConfig(
-            contents=output[1], ignore_lines=diff_ignore_lines)
-
-        if running_config.sha1 != startup_config.sha1:
-            save_config(module, result)
+        # Nothing to compare when the switch has no unsaved change
+        if has_unsaved_config(module) is not False:
+            if running_config is None:
+                running_config = get_config(module)
+            startup_config = run_commands(module, 'show config config')[0]
+            running_digest = config_digest(running_config, diff_ignore_lines)
+
+            if running_digest != config_digest(startup_config, diff_ignore_lines):
+                save_config(module, result)
     elif module.params['save_when'] == 'changed':
         if result['changed']:
             save_config(module, result)
 
     if module._diff:
-        if not running_config:
-            output = run_commands(module, 'show running-config')
-            contents = output[0]
-        else:
-            contents = running_config.config_text
-
-        # recreate the object in order to process diff_ignore_lines
-        running_config = NetworkConfig(
-            contents=contents, ignore_lines=diff_ignore_lines)
-
+        base_config = None
         if module.params['diff_against'] == 'running':
             if module.check_mode:
                 module.warn("unable to perform diff against "
                             "running-config due to check mode")
-                contents = None
             else:
-                contents = config.config_text
+                base_config = config.config_text
 
         elif module.params['diff_against'] == 'startup':
-            if not startup_config:
-                output = run_commands(module, 'show config config')
-                contents = output[0]
-            else:
-                contents = startup_config.config_text
+            if startup_config is None:
+                startup_config = run_commands(module, 'show config config')[0]
+            base_config = startup_config
 
         elif module.params['diff_against'] == 'intended':
             with open(module.params['intended_config'], 'r') as intended_file:
-                contents = intended_file.read()
-        if contents is not None:
-            base_config = NetworkConfig(
-                contents=contents, ignore_lines=diff_ignore_lines)
-
-            if running_config.sha1 != base_config.sha1:
+                base_config = intended_file.read()
+
+        if base_config is not None:
+            if running_config is None:
+                running_config = get_config(module)
+            if running_digest is None:
+                running_digest = config_digest(running_config, diff_ignore_lines)
+            if running_digest != config_digest(base_config, diff_ignore_lines):
                 result.update({
                     'changed': True,
-                    'diff': {'before': str(base_config),
-                             'after': str(running_config)}
+                    'diff': {'before': config_text(base_config, diff_ignore_lines),
+                             'after': config_text(running_config, diff_ignore_lines)}
                 })
 
     module.exit_json(**result)
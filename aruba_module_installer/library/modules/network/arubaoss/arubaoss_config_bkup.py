@@ -115,10 +115,15 @@ EXAMPLES = '''
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.network.arubaoss.arubaoss import run_commands,get_config
+from ansible.module_utils.network.arubaoss.arubaoss import run_commands,iter_collection,poll
 from ansible.module_utils.network.arubaoss.arubaoss import arubaoss_argument_spec
-from ansible.module_utils._text import to_text
-from time import sleep
+
+# Config restore states during which the configuration can not be applied
+RESTORE_RUNNING = ['CRS_IN_PROGRESS', 'CRS_FINDING_FAILED_CMDS',
+                   'CRS_CALCULATING_DIFF']
+
+# Seconds to wait for a running config restore to complete
+RESTORE_WAIT_TIME = 40
 
 
 def config_backup(module):
@@ -132,16 +137,10 @@ def config_backup(module):
             }
 
     if params['state'] == 'create':
-        check_config = get_config(module, url)
-        if check_config:
-            check_config = module.from_json(to_text(check_config))
-            if check_config['collection_result']['total_elements_count'] == 5:
-                present = False
-                for config in check_config['config_file_element']:
-                    if config['file_name'] == params['file_name']:
-                        present = True
-                if not present:
-                    return {'msg':'Only five config files are allowed.','changed':False}
+        files = [config['file_name'] for config in
+                 iter_collection(module, url, 'config_file_element')]
+        if len(files) == 5 and params['file_name'] not in files:
+            return {'msg':'Only five config files are allowed.','changed':False}
 
         result = run_commands(module, url, data, 'POST')
 
@@ -215,21 +214,17 @@ def config_restore(module):
 
 
     # Wait 40 secs for configuration to be applied
-    for _ in range(20):
-        get_status = get_config(module, url_status)
-        if get_status:
-            get_status = module.from_json(to_text(get_status))
-            status = get_status['status']
-            if status in ['CRS_IN_PROGRESS', 'CRS_FINDING_FAILED_CMDS',
-                    'CRS_CALCULATING_DIFF']:
-                if params['wait_for_apply']:
-                    sleep(2)
-                    module.log(status['status'])
-                    continue
-                else:
-                    return {'msg': 'Config restore is already running: {}'.format(status),
-                            'changed':False}
-        break
+    def progress(value):
+        if value:
+            module.log(value['status'])
+
+    timeout = RESTORE_WAIT_TIME if params['wait_for_apply'] else 0
+    completed, get_status, wait_time = poll(module, url_status,
+            lambda value: not value or value['status'] not in RESTORE_RUNNING,
+            timeout, progress=progress)
+    if not completed and not params['wait_for_apply']:
+        return {'msg': 'Config restore is already running: {}'.format(get_status['status']),
+                'changed':False}
 
 
     result = run_commands(module, url, data, 'POST',wait_after_send=5)
@@ -0,0 +1,222 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2020 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: arubaoss_facts
+
+short_description: collects facts from the device over the REST API
+
+version_added: "2.9"
+
+description:
+    - "This collects the configuration & state of the device in one task.
+       The collections of every subset requested are read at the same time
+       over one REST session and returned as ansible_net_<subset> facts,
+       the elements of a collection as a list and without the uri of each
+       object."
+
+options:
+    gather_subset:
+        description:
+            - Subsets to collect. Possible values are all, system, vlans,
+              ports, vlans-ports, acls, qos, stp, dot1x, ntp, snmp and syslog.
+              A subset can be excluded with !, e.g. !acls. system is always
+              collected.
+        default: all
+        required: false
+
+author:
+    - Aruba Networks (@ArubaNetworks)
+'''
+
+EXAMPLES = '''
+      - name: collect all facts
+        arubaoss_facts:
+
+      - name: collect vlans and ports only
+        arubaoss_facts:
+          gather_subset:
+            - vlans
+            - ports
+            - vlans-ports
+
+      - name: collect all facts except acls
+        arubaoss_facts:
+          gather_subset: "!acls"
+'''
+
+RETURN = '''
+ansible_net_gather_subset:
+    description: The subsets collected
+    returned: always
+    type: list
+ansible_net_version:
+    description: The firmware version of the device
+    returned: always
+    type: str
+ansible_net_hostname:
+    description: The name of the device
+    returned: always
+    type: str
+ansible_net_stacked:
+    description: Whether the device is a stack
+    returned: always
+    type: bool
+ansible_net_system:
+    description: The system configuration of the device
+    returned: always
+    type: dict
+ansible_net_vlans:
+    description: The VLANs of the device
+    returned: when vlans is collected
+    type: list
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.network.arubaoss.arubaoss import arubaoss_argument_spec
+from ansible.module_utils.network.arubaoss.arubaoss import get_config_bulk, get_capabilities
+from ansible.module_utils._text import to_text
+
+
+# Collections read for each subset, by name within the subset fact. A
+# subset with a single collection named None gets it as its fact.
+SUBSETS = {
+    'system': {None: '/system'},
+    'vlans': {None: '/vlans'},
+    'ports': {None: '/ports'},
+    'vlans-ports': {None: '/vlans-ports'},
+    'acls': {None: '/acls'},
+    'qos': {'policies': '/qos/policies',
+            'ports_policies': '/qos/ports-policies',
+            'vlans_policies': '/qos/vlans-policies'},
+    'stp': {None: '/stp'},
+    'dot1x': {None: '/dot1x'},
+    'ntp': {'ntp': '/config/ntp',
+            'servers': '/config/ntp/server/ip4addr',
+            'timesync': '/config/timesync'},
+    'snmp': {'communities': '/snmp-server/communities'},
+    'syslog': {'servers': '/syslog/servers'},
+}
+
+
+def get_subsets(module):
+
+    subsets = set()
+    exclude = set()
+    for subset in module.params['gather_subset']:
+        if subset == 'all':
+            subsets.update(SUBSETS)
+            continue
+        if subset.startswith('!'):
+            subset = subset[1:]
+            if subset == 'all':
+                exclude.update(SUBSETS)
+            elif subset not in SUBSETS:
+                module.fail_json(msg='Bad subset: {}'.format(subset))
+            else:
+                exclude.add(subset)
+            continue
+        if subset not in SUBSETS:
+            module.fail_json(msg='Bad subset: {}'.format(subset))
+        subsets.add(subset)
+
+    if not subsets:
+        subsets.update(SUBSETS)
+    subsets.difference_update(exclude)
+    subsets.add('system')
+    return sorted(subsets)
+
+
+def normalize(value):
+    '''
+    Returns the REST object without its uri, and a collection as the list
+    of its elements
+    '''
+    if isinstance(value, dict):
+        elements = [key for key, item in value.items()
+                    if key.endswith('_element') and isinstance(item, list)]
+        others = set(value) - set(elements) - set(['uri', 'collection_result'])
+        if len(elements) == 1 and not others:
+            return [normalize(element) for element in value[elements[0]]]
+        return dict((key, normalize(item)) for key, item in value.items()
+                    if key != 'uri')
+    if isinstance(value, list):
+        return [normalize(item) for item in value]
+    return value
+
+
+def collect(module):
+
+    subsets = get_subsets(module)
+    uris = [uri for subset in subsets for uri in SUBSETS[subset].values()]
+    bodies = get_config_bulk(module, uris)
+
+    facts = {'ansible_net_gather_subset': subsets}
+    for subset in subsets:
+        fact = {}
+        for name, uri in SUBSETS[subset].items():
+            value = None
+            if bodies[uri]:
+                value = normalize(module.from_json(to_text(bodies[uri])))
+            if name is None:
+                fact = value
+            else:
+                fact[name] = value
+        facts['ansible_net_' + subset.replace('-', '_')] = fact
+
+    capabilities = get_capabilities(module)
+    system = facts['ansible_net_system'] or {}
+    facts['ansible_net_version'] = capabilities['firmware_version']
+    facts['ansible_net_stacked'] = capabilities['stacked']
+    facts['ansible_net_hostname'] = system.get('name')
+
+    return {'changed': False, 'ansible_facts': facts}
+
+
+def run_module():
+    module_args = dict(
+        gather_subset=dict(type='list', elements='str', required=False,
+                           default=['all']),
+    )
+
+    module_args.update(arubaoss_argument_spec)
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    try:
+        result = collect(module)
+    except Exception as err:
+        return module.fail_json(msg=err)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -63,6 +63,15 @@ options:
     copy_iter:
         description:
             - Approx max iteration to wait for image copy to get completed.
+              Each iteration allows 10 seconds, the status is polled with
+              an increasing delay in between.
+    wait:
+        description:
+            - Wait for the copy to complete. If false, the module returns
+              once the transfer is started, with a job to await later
+              using arubaoss_job.
+        default: true
+        required: false
 
 
 author:
@@ -76,38 +85,42 @@ EXAMPLES = '''
           file_type: "FTT_FIRMWARE"
           action: "FTA_DOWNLOAD"
 
+      - name: start image download
+        arubaoss_file_transfer:
+          file_url: "http://192.168.1.2/WC_16_07_REL_XANADU_QA_062618.swi"
+          wait: false
+        register: download
+
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.network.arubaoss.arubaoss import run_commands
 from ansible.module_utils.network.arubaoss.arubaoss import arubaoss_argument_spec
-from ansible.module_utils.network.arubaoss.arubaoss import get_config
+from ansible.module_utils.network.arubaoss.arubaoss import await_job, job_handle
 import sys, json
-from time import sleep, time
 
-def wait_to_copy(module):
+# Seconds allowed per copy_iter iteration
+COPY_ITER_TIME = 10
+
+
+def transfer_job():
+    return job_handle("/file-transfer/status", key='status',
+                      pending=['FTS_IN_PROGRESS'], success=['FTS_COMPLETED'])
+
+
+def wait_to_copy(module, job):
     params=module.params
-    file_url = params['file_url'].split('/')
-    file_name = file_url[len(file_url)-1]
-    final_result= ""
-    wait = 1
-    while wait <= params['copy_iter']:
-        check_presence = get_config(module, "/file-transfer/status")
-        if not check_presence:
-            final_result = 'FILE TRANSFER CHECK FAILED'
-        else:
-            newdata = json.loads(check_presence)
-            final_result = newdata['status']
-            if newdata['status'] == 'FTS_IN_PROGRESS':
-                sleep(10)
-                wait += 1
-                continue
-            else:
-                break
 
+    def progress(value):
+        if value:
+            module.log('file transfer status: {}'.format(value['status']))
 
+    completed, success, status, total_time = await_job(
+        module, job, params['copy_iter'] * COPY_ITER_TIME, progress=progress)
+    if status is None:
+        return 'FILE TRANSFER CHECK FAILED', total_time
 
-    return final_result
+    return status, total_time
 
 
 
@@ -132,12 +145,12 @@ def transfer(module):
         result['failed'] = True
         result['message'] = 'Another download is in progress'
 
+    elif not params['wait']:
+        result = {'changed': True, 'msg': 'image transfer started.',
+                  'job': transfer_job()}
+
     else:
-        total_time = 0
-        start = time()
-        result  = wait_to_copy(module)
-        end = time()
-        total_time = int(end-start)
+        result, total_time = wait_to_copy(module, transfer_job())
 
         if result == 'FTS_COMPLETED':
             result = {'changed':True,'msg': 'image transfer  successful.','total_time':total_time}
@@ -167,6 +180,7 @@ def run_module():
         boot_image=dict(type='str', required=False, default='BI_PRIMARY_IMAGE',
             choices=['BI_PRIMARY_IMAGE','BI_SECONDARY_IMAGE']),
         copy_iter=dict(type='int', required=False, default=20),
+        wait=dict(type='bool', required=False, default=True),
     )
 
     module_args.update(arubaoss_argument_spec)
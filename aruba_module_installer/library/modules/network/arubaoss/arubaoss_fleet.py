@@ -0,0 +1,176 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2020 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: arubaoss_fleet
+
+short_description: applies the same REST operations to many switches at once
+
+version_added: "2.9"
+
+description:
+    - "This sends a list of REST operations to every switch of a list,
+       configuring the switches concurrently from one task instead of one
+       fork per switch. Each switch gets a REST session of its own, opened
+       once for all the operations. Run it once, e.g. against localhost
+       with connection local, for simple fleet wide changes such as the
+       NTP server, syslog host or SNMP community."
+
+options:
+    hosts:
+        description:
+            - Switches to configure. Each item takes host and optionally
+              port, username, password, use_ssl and validate_certs. Options
+              not set in an item are taken from the task. An item setting a
+              use_ssl other than the task's but no port uses the default port
+              of its use_ssl, 443 or 80.
+        required: true
+    operations:
+        description:
+            - REST operations sent in order to every switch. Each item takes
+              the uri relative to the REST api version, e.g. /system, the
+              method (GET, POST, PUT or DELETE, default GET), the payload and
+              the uri to check, as arubaoss modules do, so that a switch
+              already configured is not changed. GET operations and checks
+              are read before any write is sent, so the operations must
+              target distinct objects.
+        required: true
+    forks:
+        description:
+            - Number of switches configured at the same time.
+        default: 20
+        required: false
+
+author:
+    - Aruba Networks (@ArubaNetworks)
+'''
+
+EXAMPLES = '''
+      - name: set the syslog server of every switch
+        arubaoss_fleet:
+          username: manager
+          password: "{{ switch_password }}"
+          hosts:
+            - host: 10.1.1.1
+            - host: 10.1.1.2
+            - host: 10.1.1.3
+              use_ssl: true
+          operations:
+            - method: POST
+              uri: /syslog/servers
+              payload:
+                ip_address:
+                  version: IAV_IP_V4
+                  octets: 10.100.1.1
+                transport_protocol: TP_UDP
+              check: /syslog/servers/10.100.1.1
+        run_once: true
+'''
+
+RETURN = '''
+results:
+    description: Result of each switch, in the order of hosts, with its
+      host & port and the result of each operation in results
+    returned: always
+    type: list
+failed_hosts:
+    description: Switches on which an operation failed, as host:port
+    returned: always
+    type: list
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.network.arubaoss.arubaoss import arubaoss_argument_spec
+from ansible.module_utils.network.arubaoss.arubaoss import run_fleet
+
+
+def fleet(module):
+
+    params = module.params
+    for op in params['operations']:
+        if op['method'] in ('POST', 'PUT') and op['payload'] is None:
+            return {'msg': 'payload is required for {} {}'.format(op['method'], op['uri']),
+                    'changed': False, 'failed': True}
+
+    operations = [dict((key, value) for key, value in op.items() if value is not None)
+                  for op in params['operations']]
+    results = run_fleet(module, params['hosts'], operations, params['forks'])
+
+    failed_hosts = ['{}:{}'.format(result['host'], result['port'])
+                    for result in results if result.get('failed')]
+    result = {'changed': any(result.get('changed', False) for result in results),
+              'results': results,
+              'failed_hosts': failed_hosts}
+    if failed_hosts:
+        result['failed'] = True
+        result['msg'] = 'Failed on {} of {} switches'.format(len(failed_hosts), len(results))
+
+    return result
+
+
+def run_module():
+    module_args = dict(
+        hosts=dict(type='list', elements='dict', required=True, options=dict(
+            host=dict(type='str', required=True),
+            port=dict(type='int'),
+            username=dict(type='str'),
+            password=dict(type='str', no_log=True),
+            use_ssl=dict(type='bool'),
+            validate_certs=dict(type='bool'),
+        )),
+        operations=dict(type='list', elements='dict', required=True, options=dict(
+            method=dict(type='str', default='GET',
+                choices=['GET', 'POST', 'PUT', 'DELETE']),
+            uri=dict(type='str', required=True),
+            payload=dict(type='dict'),
+            check=dict(type='str'),
+        )),
+        forks=dict(type='int', required=False, default=20),
+    )
+
+    module_args.update(arubaoss_argument_spec)
+
+    result = dict(changed=False,warnings='Not Supported')
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    if module.check_mode:
+        module.exit_json(**result)
+
+    try:
+        result = fleet(module)
+    except Exception as err:
+        return module.fail_json(msg=err)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -36,8 +36,8 @@ description:
 options:
     interface:
         description:
-            - interface id to be configured
-        required: true
+            - interface id to be configured, required unless aggregate is given
+        required: false
     description:
         description:
             - interface name/description, to remove the description of an interface
@@ -59,6 +59,25 @@ options:
         description:
             - Direction in which ACL will be applied.
         required: false
+    aggregate:
+        description:
+            - List of interfaces to configure in one task. Each item takes
+              the options above, options not set in an item are taken from
+              the task. The ports are read and configured in bulk.
+        required: false
+    state:
+        description:
+            - create or delete the QoS policy or ACL of the port. With
+              aggregate, merged, replaced and overridden reconcile the items
+              with the switch, reading the ports, port QoS policies and port
+              ACLs with one GET each and sending only the differences. merged
+              adds the items, replaced also removes the other QoS policies &
+              ACLs of the ports given, overridden those of every port. QoS
+              policies and ACLs are reconciled only when an item sets
+              qos_policy or acl_id.
+        default: create
+        choices: create, delete, merged, replaced, overridden
+        required: false
 
 
 author:
@@ -97,18 +116,48 @@ EXAMPLES = '''
           acl_type: standard
           acl_direction: in
 
+      - name: configure description of several ports
+        arubaoss_interface:
+          aggregate:
+            - interface: 1
+              description: "uplink"
+            - interface: 2
+              description: "server"
+          admin_stat: true
+
+      - name: make my_qos the only QoS policy of ports 1 and 2
+        arubaoss_interface:
+          state: replaced
+          qos_policy: "my_qos"
+          aggregate:
+            - interface: 1
+            - interface: 2
+
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.network.arubaoss.arubaoss import run_commands,get_config
+from ansible.module_utils.network.arubaoss.arubaoss import get_config_bulk, run_bulk
+from ansible.module_utils.network.arubaoss.arubaoss import aggregate_items, item_module
+from ansible.module_utils.network.arubaoss.arubaoss import get_collections, reconcile
 from ansible.module_utils.network.arubaoss.arubaoss import arubaoss_argument_spec
 from ansible.module_utils._text import to_text
 
 
 def config_port(module):
 
-    params = module.params
-    url = '/ports/'+  module.params['interface']
+    operation = port_operation(module.params)
+    result = run_commands(module, operation['uri'], operation['payload'],
+                          operation['method'], check=operation['check'])
+
+    return result
+
+
+def port_operation(params):
+    '''
+    Returns the run_commands operation configuring the port
+    '''
+    url = '/ports/'+  params['interface']
 
     data = {'id': params['interface']}
 
@@ -118,9 +167,126 @@ def config_port(module):
     if params.get('admin_stat') != None:
         data['is_port_enabled'] = params['admin_stat']
 
-    result = run_commands(module, url, data, 'PUT',check=url)
+    return {'method': 'PUT', 'uri': url, 'payload': data, 'check': url}
+
+
+def config_aggregate(module):
+    '''
+    Configures every interface of the aggregate in one module run. The
+    ports are read and their name & status written in bulk, qos and acl
+    items are configured one by one.
+    '''
+    items = aggregate_items(module)
+    current = get_config_bulk(module, ['/ports/' + str(item['interface'])
+                                       for item in items])
+
+    results = [None] * len(items)
+    operations = []
+    for index, item in enumerate(items):
+        port_url = '/ports/' + str(item['interface'])
+        if not current[port_url]:
+            results[index] = {'msg': 'Port {} not present on device {}'.format(item['interface'],port_url),
+                    'changed':False}
+        elif item['qos_policy'] or item['acl_id']:
+            item_mod = item_module(module, item)
+            results[index] = qos(item_mod) if item['qos_policy'] else acl(item_mod)
+        else:
+            operations.append((index, port_operation(item)))
 
-    return result
+    bulk_results = run_bulk(module, [op for index, op in operations])
+    for (index, op), result in zip(operations, bulk_results):
+        results[index] = result
+
+    return {'changed': any(result.get('changed') for result in results),
+            'failed': any(result.get('failed', False) for result in results),
+            'results': results}
+
+
+def reconcile_aggregate(module):
+    '''
+    Brings the ports, port QoS policies and port ACLs of the switch to the
+    aggregate items, as given by state. Each collection is read with one
+    GET and only the differences are written. QoS policies and ACLs are
+    reconciled only when an item sets qos_policy or acl_id.
+    '''
+    params = module.params
+    state = params['state']
+    items = []
+    for item in params['aggregate']:
+        item_params = dict(params)
+        item_params.update((key, value) for key, value in item.items()
+                           if value is not None)
+        if item_params['interface'] is None:
+            return {'msg': 'interface is required in every aggregate item',
+                    'changed': False, 'failed': True}
+        if item_params['acl_id'] and item_params['acl_direction'] is None:
+            return {'msg': 'Missing parameter: acl_direction','changed':False,
+                    'failed': True}
+        items.append(item_params)
+
+    collections = {'/ports': ('port_element', lambda ele: ele['id'])}
+    if any(item['qos_policy'] for item in items):
+        collections['/qos/ports-policies'] = ('qos_port_policy_element',
+            lambda ele: '{}-{}-{}'.format(ele['port_id'], ele['policy_id'], ele['direction']))
+    if any(item['acl_id'] for item in items):
+        collections['/ports-access-groups'] = ('acl_port_policy_element',
+            lambda ele: '{}-{}-{}'.format(ele['port_id'], ele['acl_id'], ele['direction']))
+    current = get_collections(module, collections)
+
+    ports = set()
+    desired = dict((uri, []) for uri in collections)
+    payloads = {}
+    for item in items:
+        port_id = str(item['interface'])
+        if port_id not in current['/ports']:
+            return {'msg': 'Port {} not present on device {}'.format(port_id, '/ports/' + port_id),
+                    'changed': False, 'failed': True}
+        ports.add(port_id)
+
+        fields = {}
+        if item['description'] is not None:
+            fields['name'] = item['description']
+        if item['admin_stat'] is not None:
+            fields['is_port_enabled'] = item['admin_stat']
+        desired['/ports'].append((port_id, fields))
+
+        if item['qos_policy']:
+            data = {'port_id': port_id,
+                    'policy_id': item['qos_policy'] + '~QPT_QOS',
+                    'direction': item['qos_direction']}
+            qos_id = '{}-{}-{}'.format(port_id, data['policy_id'], data['direction'])
+            payloads[qos_id] = data
+            desired['/qos/ports-policies'].append((qos_id, {}))
+
+        if item['acl_id']:
+            data = {'port_id': port_id,
+                    'acl_id': item['acl_id'] + '~' + item['acl_type'],
+                    'direction': item['acl_direction']}
+            acl_id = '{}-{}-{}'.format(port_id, data['acl_id'], data['direction'])
+            payloads[acl_id] = data
+            desired['/ports-access-groups'].append((acl_id, {}))
+
+    operations = []
+    for uri in ('/qos/ports-policies', '/ports-access-groups'):
+        if uri not in collections:
+            continue
+        create, update, delete = reconcile(current[uri], desired[uri], state,
+                                           in_scope=lambda ele: ele['port_id'] in ports)
+        operations += [{'method': 'DELETE', 'uri': uri + '/' + obj_id}
+                       for obj_id in delete]
+        operations += [{'method': 'POST', 'uri': uri, 'payload': payloads[obj_id]}
+                       for obj_id in create]
+
+    # Ports are never created or deleted, only their name & status updated
+    create, update, delete = reconcile(current['/ports'], desired['/ports'], 'merged')
+    for port_id, fields in update:
+        fields['id'] = port_id
+        operations.append({'method': 'PUT', 'uri': '/ports/' + port_id, 'payload': fields})
+
+    results = run_bulk(module, operations)
+    return {'changed': bool(operations),
+            'failed': any(result.get('failed', False) for result in results),
+            'results': results}
 
 
 def qos(module):
@@ -216,14 +382,14 @@ def acl(module):
 
 def run_module():
     module_args = dict(
-        interface=dict(type='str', required=True),
+        interface=dict(type='str', required=False),
         description=dict(type='str', required=False),
         admin_stat=dict(type='bool', required=False),
         qos_policy=dict(type='str', required=False),
         qos_direction=dict(type='str', required=False, default='QPPD_INBOUND',
             choices=['QPPD_INBOUND','QPPD_OUTBOUND']),
         state=dict(type='str', required=False, default='create',
-            choices=['create','delete']),
+            choices=['create','delete','merged','replaced','overridden']),
         acl_id=dict(type='str', required=False),
         acl_type=dict(type='str', required=False, default='AT_STANDARD_IPV4',
             choices=['AT_STANDARD_IPV4','AT_EXTENDED_IPV4','AT_CONNECTION_RATE_FILTER']),
@@ -231,18 +397,41 @@ def run_module():
             'AD_OUTBOUND','AD_CRF']),
     )
 
+    # Each aggregate item takes the per-interface options, unset ones are
+    # taken from the top level options of the task
+    aggregate_spec = dict((key, dict((name, spec[name]) for name in ('type', 'choices')
+                                     if name in spec))
+                          for key, spec in module_args.items())
+    module_args['aggregate'] = dict(type='list', elements='dict',
+                                    required=False, options=aggregate_spec)
+
     module_args.update(arubaoss_argument_spec)
 
     result = dict(changed=False,warnings='Not Supported')
 
     module = AnsibleModule(
         argument_spec=module_args,
+        required_one_of=[['interface', 'aggregate']],
         supports_check_mode=True
     )
 
     if module.check_mode:
         module.exit_json(**result)
 
+    reconciled = module.params['state'] in ('merged', 'replaced', 'overridden')
+    if reconciled and not module.params['aggregate']:
+        module.fail_json(msg='state {} requires aggregate'.format(module.params['state']))
+
+    if module.params['aggregate']:
+        try:
+            if reconciled:
+                result = reconcile_aggregate(module)
+            else:
+                result = config_aggregate(module)
+        except Exception as err:
+            return module.fail_json(msg=err)
+        module.exit_json(**result)
+
     port_url = '/ports/' + str(module.params['interface'])
     check_port = get_config(module,port_url)
     if not check_port:
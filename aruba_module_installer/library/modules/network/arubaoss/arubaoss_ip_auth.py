@@ -83,9 +83,8 @@ EXAMPLES = '''
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.network.arubaoss.arubaoss import run_commands,get_config
+from ansible.module_utils.network.arubaoss.arubaoss import run_commands,iter_collection
 from ansible.module_utils.network.arubaoss.arubaoss import arubaoss_argument_spec
-from ansible.module_utils._text import to_text
 
 
 def ip_auth(module):
@@ -114,24 +113,20 @@ def ip_auth(module):
                 }
 
         if not params['auth_id']:
-            auth_check = get_config(module, url)
-            if auth_check:
-                check_config = module.from_json(to_text(auth_check))
-                total = 0
-                check = 0
-
-                for ele in check_config['ip_auth_element']:
-                    for key in data:
-                        if key in ele:
-                            if ele[key] != data[key]:
-                                check += 1
-                                break
-
-                total = check_config['collection_result']['total_elements_count']
-                print("COUNT",total,check)
-                diff = total - check
-                if (total > 1 and diff == 1) or (total == 1 and check == 0):
-                    return {'msg': 'Ip auth rule already exists.','changed':False}
+            total = 0
+            check = 0
+
+            for ele in iter_collection(module, url, 'ip_auth_element'):
+                total += 1
+                for key in data:
+                    if key in ele:
+                        if ele[key] != data[key]:
+                            check += 1
+                            break
+
+            diff = total - check
+            if (total > 1 and diff == 1) or (total == 1 and check == 0):
+                return {'msg': 'Ip auth rule already exists.','changed':False}
 
 
             result = run_commands(module, url, data, 'POST')
@@ -0,0 +1,126 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2020 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: arubaoss_job
+
+short_description: waits for a long running operation started earlier
+
+version_added: "2.9"
+
+description:
+    - "This waits for an operation which a module started without waiting
+       for it, such as an image copy started by arubaoss_file_transfer
+       with wait false or a reboot by arubaoss_reboot with is_wait false.
+       Starting the operations on every switch first and awaiting them in
+       a later task lets them run at the same time."
+
+options:
+    job:
+        description:
+            - The job returned by the module which started the operation.
+        required: true
+    wait_timeout:
+        description:
+            - Maximum time in seconds to wait for the operation to complete.
+              The status is polled with an increasing delay in between.
+        default: 600
+        required: false
+
+author:
+    - Aruba Networks (@ArubaNetworks)
+'''
+
+EXAMPLES = '''
+      - name: start image download
+        arubaoss_file_transfer:
+          file_url: "http://192.168.1.2/WC_16_07_REL_XANADU_QA_062618.swi"
+          wait: false
+        register: download
+
+      - name: wait for image download
+        arubaoss_job:
+          job: "{{ download.job }}"
+          wait_timeout: 900
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.network.arubaoss.arubaoss import arubaoss_argument_spec
+from ansible.module_utils.network.arubaoss.arubaoss import await_job
+
+
+def wait_for_job(module):
+
+    params = module.params
+    job = params['job']
+    if not job.get('uri'):
+        return {'msg': 'job is not a job returned by an arubaoss module',
+                'changed': False, 'failed': True}
+
+    completed, success, status, total_time = await_job(module, job, params['wait_timeout'])
+
+    result = {'changed': False, 'status': status, 'total_time': total_time}
+    if not completed:
+        result['failed'] = True
+        result['msg'] = 'Job did not complete in {} seconds'.format(params['wait_timeout'])
+    elif not success:
+        result['failed'] = True
+        result['msg'] = 'Job failed with status: {}'.format(status)
+    else:
+        result['msg'] = 'Job completed.'
+
+    return result
+
+
+def run_module():
+    module_args = dict(
+        job=dict(type='dict', required=True),
+        wait_timeout=dict(type='int', required=False, default=600),
+    )
+
+    module_args.update(arubaoss_argument_spec)
+
+    result = dict(changed=False,warnings='Not Supported')
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    if module.check_mode:
+        module.exit_json(**result)
+
+    try:
+        result = wait_for_job(module)
+    except Exception as err:
+        return module.fail_json(msg=err)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -43,7 +43,8 @@ options:
         required: true
     is_wait:
         description:
-            - Wait for boot or skip the reboot
+            - Wait for boot or skip the reboot. If skipped, the module
+              returns a job to await the boot later using arubaoss_job.
         default: true
         choice: true, false
         required: false
@@ -63,24 +64,21 @@ EXAMPLES = '''
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.network.arubaoss.arubaoss import run_commands,get_config
 from ansible.module_utils.network.arubaoss.arubaoss import arubaoss_argument_spec
-from time import sleep, time
+from ansible.module_utils.network.arubaoss.arubaoss import await_job, job_handle
 
+# Seconds to wait for the device to come up
+BOOT_TIMEOUT = 300
 
-def wait_for_boot(module):
 
-    url = '/system/status'
-    wait = 1
+def boot_job():
+    # The session does not survive the reboot
+    return job_handle('/system/status', check_login=False)
 
-    msg_queue = []
-    while wait <= 60:
-        result = get_config(module, url, check_login=False)
-        if result:
-            return result
 
-        sleep(5)
-        wait += 1
+def wait_for_boot(module, job):
 
-    return False
+    completed, success, status, total_time = await_job(module, job, BOOT_TIMEOUT)
+    return completed, total_time
 
 
 def reboot(module):
@@ -101,12 +99,11 @@ def reboot(module):
     result = run_commands(module, url, data, 'reboot')
     total_time = 0
 
-    if result['message'] == 'Device is rebooting' and params['is_wait']:
-        start = time()
-        result  = wait_for_boot(module)
+    if result['message'] == 'Device is rebooting' and not params['is_wait']:
+        result['job'] = boot_job()
 
-        end = time()
-        total_time = int(end-start)
+    elif result['message'] == 'Device is rebooting':
+        result, total_time = wait_for_boot(module, boot_job())
 
         if result:
             result = {'changed':True,'msg': 'Device reboot successful.','total_time':total_time}
@@ -43,8 +43,8 @@ options:
         choices: create, delete
         required: False
     vlan_id:
-        description: vlan id to be configured
-        required: true
+        description: vlan id to be configured, required unless aggregate is given
+        required: false
     name:
         description: Name of the VLAN. While creating a Vlan If name is given
         as empty string, default value (VLANx, where x is the vlan_id) will be
@@ -140,7 +140,25 @@ options:
         description:  Sets the interval in seconds between IGMP queries
         required: false
         default: 125 [5-300]
-
+    aggregate:
+        description: List of VLANs to configure with the same command in one
+        task. Each item takes the options above, options not set in an item
+        are taken from the task. config_vlan and config_vlan_port items are
+        read and configured in bulk.
+        required: false
+    state:
+        description: Reconciles the aggregate items with the switch instead
+        of configuring them one by one, for the config_vlan, config_vlan_port
+        and config_vlan_dhcpHelperAddress commands. The current configuration
+        is read with one GET per collection and only the differences are sent.
+        merged adds or updates the items, comparing only the options set in
+        the items. replaced also resets the other options of the items to
+        their defaults, and removes the other ports & helper addresses of the
+        VLANs given. overridden also removes every VLAN, VLAN port or helper
+        address not given, except the default VLAN and its ports, unless the
+        default VLAN is given. config is not used.
+        choices: merged, replaced, overridden
+        required: false
 
 author:
     - Sanju Sadanandan (@hpe)
@@ -178,12 +196,37 @@ EXAMPLES = '''
           vlan_id: 2
           command: config_vlan_igmp
           is_igmp_enabled: false
+
+      - name: add ports 1 to 4 to VLAN 300
+        arubaoss_vlan:
+          command: config_vlan_port
+          vlan_id: 300
+          port_mode: POM_TAGGED_STATIC
+          aggregate:
+            - port_id: 1
+            - port_id: 2
+            - port_id: 3
+            - port_id: 4
+
+      - name: make ports 1 and 2 the only tagged ports of VLAN 300
+        arubaoss_vlan:
+          command: config_vlan_port
+          state: replaced
+          port_mode: POM_TAGGED_STATIC
+          aggregate:
+            - vlan_id: 300
+              port_id: 1
+            - vlan_id: 300
+              port_id: 2
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.network.arubaoss.arubaoss import run_commands
 from ansible.module_utils.network.arubaoss.arubaoss import get_config
-from ansible.module_utils.network.arubaoss.arubaoss import get_firmware
+from ansible.module_utils.network.arubaoss.arubaoss import has_feature
+from ansible.module_utils.network.arubaoss.arubaoss import get_config_bulk, run_bulk
+from ansible.module_utils.network.arubaoss.arubaoss import aggregate_items, item_module
+from ansible.module_utils.network.arubaoss.arubaoss import get_collections, reconcile
 from ansible.module_utils.network.arubaoss.arubaoss import arubaoss_argument_spec
 from ansible.module_utils._text import to_text
 import json
@@ -293,16 +336,10 @@ def config_vlan_port(module):
     if params['vlan_id'] == "":
         return {'msg': "vlan_id cannot be null",
                 'changed': False, 'failed': True}
-    else:
-        data = {'vlan_id': params['vlan_id']}
 
     if params['port_id'] == "":
         return {'msg': "port_id cannot be null",
                 'changed': False, 'failed': True}
-    else:
-        data['port_id'] = params['port_id']
-
-    data['port_mode'] = params['port_mode']
 
     del_url = "/vlans-ports/" + str(params['vlan_id']) + "-" + str(params['port_id'])
 
@@ -311,24 +348,45 @@ def config_vlan_port(module):
     if not check_presence:
         return {'msg': 'Cannot configure ports without Vlan configured',
                 'changed': False, 'failed': True}
-    else:
-        if params['config'] == "create":
-            check_presence = get_config(module, del_url)
-            if not check_presence:
-                url = '/vlans-ports'
-                method = 'POST'
-            else:
-                url = "/vlans-ports/" + str(params['vlan_id']) + "-" + str(params['port_id'])
-                method = 'PUT'
-        elif params['config'] == "delete":
-            url = "/vlans-ports/" + str(params['vlan_id']) + "-" + str(params['port_id'])
-            method = 'DELETE'
+
+    if params['config'] == "create":
+        check_presence = get_config(module, del_url)
+
+    operation = vlan_port_operation(params, check_presence)
+    if operation.get('failed'):
+        return operation
+
+    result = run_commands(module, operation['uri'], operation['payload'],
+                          operation['method'], check=operation['check'])
+    return result
+
+
+def vlan_port_operation(params, check_presence):
+    '''
+    Returns the run_commands operation configuring the port of the VLAN,
+    or the failed result. check_presence is the current vlans-ports entry.
+    '''
+    data = {'vlan_id': params['vlan_id'],
+            'port_id': params['port_id'],
+            'port_mode': params['port_mode']}
+
+    del_url = "/vlans-ports/" + str(params['vlan_id']) + "-" + str(params['port_id'])
+
+    if params['config'] == "create":
+        if not check_presence:
+            url = '/vlans-ports'
+            method = 'POST'
         else:
-            return {'msg': 'Valid config options are : create and delete',
-                'changed': False, 'failed': True}
+            url = del_url
+            method = 'PUT'
+    elif params['config'] == "delete":
+        url = del_url
+        method = 'DELETE'
+    else:
+        return {'msg': 'Valid config options are : create and delete',
+            'changed': False, 'failed': True}
 
-        result = run_commands(module, url, data, method, check=del_url)
-        return result
+    return {'method': method, 'uri': url, 'payload': data, 'check': del_url}
 
 # Add dhcp helper address to vlan
 """
@@ -399,31 +457,33 @@ def config_vlan(module):
     if params['vlan_id'] == "":
         return {'msg': "vlan_id cannot be null",
                 'changed': False, 'failed': True}
-    else:
-        data = {'vlan_id': params['vlan_id']}
 
-    if params['name'] == "":
-        data['name'] = "VLAN{}".format(params['vlan_id'])
-    else:
-        data['name'] = params['name']
+    dhcp_server = has_feature(module, 'dhcp_server')
 
-    data['status'] = params['status']
-    data['type'] = params['vlantype']
-    data['is_jumbo_enabled'] = params['is_jumbo_enabled']
-    data['is_voice_enabled'] = params['is_voice_enabled']
-    data['is_dsnoop_enabled'] = params['is_dsnoop_enabled']
+    check_presence = None
+    if params['config'] == "create":
+        check_presence = get_config(module, "/vlans/" + str(params['vlan_id']))
 
-    firmware = get_firmware(module)
-    if (firmware[:2] == "YA") or (firmware[:2] == "YB"):
-        if params['is_dhcp_server_enabled']:
-            return {'msg': "option : is_dhcp_server_enabled is not supported on this platform",
-                    'changed': False, 'failed': True}
-    else:
-        data['is_dhcp_server_enabled'] = params['is_dhcp_server_enabled']
+    operation = vlan_operation(module, params, dhcp_server, check_presence)
+    if operation.get('failed'):
+        return operation
+
+    result = run_commands(module, operation['uri'], operation['payload'],
+                          operation['method'], check=operation['check'])
+    return result
+
+
+def vlan_operation(module, params, dhcp_server, check_presence):
+    '''
+    Returns the run_commands operation configuring the VLAN, or the failed
+    result. check_presence is the current configuration of the VLAN.
+    '''
+    data = vlan_data(params, dhcp_server)
+    if data.get('failed'):
+        return data
 
     config_url = "/vlans/" + str(params['vlan_id'])
     if params['config'] == "create":
-        check_presence = get_config(module, config_url)
         if not check_presence:
             data['is_management_vlan'] = params['is_management_vlan']
             url = "/vlans"
@@ -438,8 +498,36 @@ def config_vlan(module):
         url = config_url
         method = 'DELETE'
 
-    result = run_commands(module, url, data, method, check=config_url)
-    return result
+    return {'method': method, 'uri': url, 'payload': data, 'check': config_url}
+
+
+def vlan_data(params, dhcp_server):
+    '''
+    Returns the VLAN payload for params, without is_management_vlan, or
+    the failed result. dhcp_server tells whether the switch supports the
+    DHCP server.
+    '''
+    data = {'vlan_id': params['vlan_id']}
+
+    if params['name'] == "":
+        data['name'] = "VLAN{}".format(params['vlan_id'])
+    else:
+        data['name'] = params['name']
+
+    data['status'] = params['status']
+    data['type'] = params['vlantype']
+    data['is_jumbo_enabled'] = params['is_jumbo_enabled']
+    data['is_voice_enabled'] = params['is_voice_enabled']
+    data['is_dsnoop_enabled'] = params['is_dsnoop_enabled']
+
+    if not dhcp_server:
+        if params['is_dhcp_server_enabled']:
+            return {'msg': "option : is_dhcp_server_enabled is not supported on this platform",
+                    'changed': False, 'failed': True}
+    else:
+        data['is_dhcp_server_enabled'] = params['is_dhcp_server_enabled']
+
+    return data
 
 
 def config_qos(module):
@@ -570,6 +658,261 @@ def config_igmp(module):
     result = run_commands(module, url, data, method)
     return result
 
+"""
+-------
+Name: config_aggregate
+
+Configures every item of the aggregate in one module run. VLANs and
+VLAN ports are read and written in bulk, other commands item by item.
+
+param request: module
+
+Returns
+ Configure the switch with the params of each item
+-------
+"""
+def config_aggregate(module):
+
+    items = aggregate_items(module)
+
+    command = module.params['command']
+    results = [None] * len(items)
+    operations = []
+
+    if command in ('config_vlan', 'config_vlan_port'):
+        uris = ["/vlans/" + str(item['vlan_id']) for item in items]
+        if command == 'config_vlan_port':
+            uris += ["/vlans-ports/" + str(item['vlan_id']) + "-" + str(item['port_id'])
+                     for item in items]
+        else:
+            dhcp_server = has_feature(module, 'dhcp_server')
+        current = get_config_bulk(module, uris)
+
+        for index, item in enumerate(items):
+            check_presence = current["/vlans/" + str(item['vlan_id'])]
+            if command == 'config_vlan':
+                if item['config'] != 'create':
+                    check_presence = None
+                operation = vlan_operation(module, item, dhcp_server, check_presence)
+            elif not check_presence:
+                operation = {'msg': 'Cannot configure ports without Vlan configured',
+                             'changed': False, 'failed': True}
+            else:
+                operation = vlan_port_operation(
+                    item, current["/vlans-ports/" + str(item['vlan_id']) + "-" + str(item['port_id'])])
+
+            if operation.get('failed'):
+                results[index] = operation
+            else:
+                operations.append((index, operation))
+
+        bulk_results = run_bulk(module, [op for index, op in operations])
+        for (index, op), result in zip(operations, bulk_results):
+            results[index] = result
+    else:
+        for index, item in enumerate(items):
+            results[index] = COMMANDS[command](item_module(module, item))
+
+    return {'changed': any(result.get('changed') for result in results),
+            'failed': any(result.get('failed', False) for result in results),
+            'results': results}
+
+"""
+-------
+Name: reconcile_aggregate
+
+Brings the VLANs, VLAN ports or DHCP helper addresses of the switch to
+the aggregate items, as given by state. The current configuration is
+read with one GET per collection and only the differences are written.
+
+param request: module
+
+Returns
+ Configure the switch with the changes needed
+-------
+"""
+def reconcile_aggregate(module):
+
+    params = module.params
+    items = []
+    for item in params['aggregate']:
+        given = dict((key, value) for key, value in item.items()
+                     if value is not None)
+        item_params = dict(params)
+        item_params.update(given)
+        if item_params['vlan_id'] is None:
+            return {'msg': "vlan_id is required in every aggregate item",
+                    'changed': False, 'failed': True}
+        items.append((given, item_params))
+
+    if params['command'] == 'config_vlan':
+        operations = reconcile_vlans(module, items, params['state'])
+    elif params['command'] == 'config_vlan_port':
+        operations = reconcile_vlan_ports(module, items, params['state'])
+    else:
+        operations = reconcile_dhcp_helpers(module, items, params['state'])
+
+    if isinstance(operations, dict):
+        return operations
+
+    results = run_bulk(module, operations)
+    return {'changed': bool(operations),
+            'failed': any(result.get('failed', False) for result in results),
+            'results': results}
+
+
+# Module options compared for merged VLANs, with their REST field
+VLAN_FIELDS = (
+    ('name', 'name'),
+    ('status', 'status'),
+    ('vlantype', 'type'),
+    ('is_jumbo_enabled', 'is_jumbo_enabled'),
+    ('is_voice_enabled', 'is_voice_enabled'),
+    ('is_dsnoop_enabled', 'is_dsnoop_enabled'),
+    ('is_dhcp_server_enabled', 'is_dhcp_server_enabled'),
+    ('is_management_vlan', 'is_management_vlan'),
+)
+
+
+def reconcile_vlans(module, items, state):
+    '''
+    Returns the operations bringing /vlans to the items. The default VLAN
+    is never deleted.
+    '''
+    dhcp_server = has_feature(module, 'dhcp_server')
+    current = get_collections(module, {
+        '/vlans': ('vlan_element', lambda ele: ele['vlan_id'])})['/vlans']
+
+    desired = []
+    payloads = {}
+    for given, item in items:
+        data = vlan_data(item, dhcp_server)
+        if data.get('failed'):
+            return data
+        data['is_management_vlan'] = item['is_management_vlan']
+        payloads[item['vlan_id']] = data
+
+        if state == 'merged':
+            fields = dict((field, data[field]) for option, field in VLAN_FIELDS
+                          if option in given and field in data)
+        else:
+            fields = dict(data)
+        desired.append((item['vlan_id'], fields))
+
+    create, update, delete = reconcile(current, desired, state)
+
+    operations = [{'method': 'DELETE', 'uri': '/vlans/' + str(vlan_id)}
+                  for vlan_id in delete if vlan_id != 1]
+    operations += [{'method': 'POST', 'uri': '/vlans', 'payload': payloads[vlan_id]}
+                   for vlan_id in create]
+    operations += [{'method': 'PUT', 'uri': '/vlans/' + str(vlan_id), 'payload': fields}
+                   for vlan_id, fields in update]
+    return operations
+
+
+def reconcile_vlan_ports(module, items, state):
+    '''
+    Returns the operations bringing /vlans-ports to the items. replaced
+    removes the other ports of the VLANs given. The ports of the default
+    VLAN are only removed when it is given.
+    '''
+    collections = get_collections(module, {
+        '/vlans': ('vlan_element', lambda ele: ele['vlan_id']),
+        '/vlans-ports': ('vlan_port_element',
+                         lambda ele: '{}-{}'.format(ele['vlan_id'], ele['port_id'])),
+    })
+
+    vlans = set()
+    desired = []
+    payloads = {}
+    for given, item in items:
+        if item['port_id'] == "":
+            return {'msg': "port_id cannot be null",
+                    'changed': False, 'failed': True}
+        if item['vlan_id'] not in collections['/vlans']:
+            return {'msg': 'Cannot configure ports without Vlan configured',
+                    'changed': False, 'failed': True}
+
+        vlans.add(item['vlan_id'])
+        vlan_port = '{}-{}'.format(item['vlan_id'], item['port_id'])
+        payloads[vlan_port] = {'vlan_id': item['vlan_id'],
+                               'port_id': item['port_id'],
+                               'port_mode': item['port_mode']}
+        fields = {}
+        if state != 'merged' or 'port_mode' in given:
+            fields['port_mode'] = item['port_mode']
+        desired.append((vlan_port, fields))
+
+    create, update, delete = reconcile(
+        collections['/vlans-ports'], desired, state,
+        in_scope=lambda ele: ele['vlan_id'] in vlans)
+
+    operations = [{'method': 'DELETE', 'uri': '/vlans-ports/' + vlan_port}
+                  for vlan_port in delete
+                  if 1 in vlans or collections['/vlans-ports'][vlan_port]['vlan_id'] != 1]
+    operations += [{'method': 'POST', 'uri': '/vlans-ports', 'payload': payloads[vlan_port]}
+                   for vlan_port in create]
+    operations += [{'method': 'PUT', 'uri': '/vlans-ports/' + vlan_port,
+                    'payload': payloads[vlan_port]}
+                   for vlan_port, fields in update]
+    return operations
+
+
+def reconcile_dhcp_helpers(module, items, state):
+    '''
+    Returns the operations bringing /vlans/dhcp-relay to the items.
+    replaced removes the other helper addresses of the VLANs given.
+    '''
+    collections = get_collections(module, {
+        '/vlans': ('vlan_element', lambda ele: ele['vlan_id']),
+        '/vlans/dhcp-relay': ('dhcp_relay_element',
+                              lambda ele: '{}-{}'.format(
+                                  ele['vlan_id'], ele['dhcp_helper_address']['octets'])),
+    })
+
+    vlans = set()
+    desired = []
+    payloads = {}
+    for given, item in items:
+        if item['helper_addresses'] == "":
+            return {'msg': "DHCP Helper IP Addr cannot be null",
+                    'changed': False, 'failed': True}
+        if item['vlan_id'] not in collections['/vlans']:
+            return {'msg': 'Cannot configure Helper Address without Vlan configured',
+                    'changed': False, 'failed': True}
+
+        vlans.add(item['vlan_id'])
+        helper = '{}-{}'.format(item['vlan_id'], item['helper_addresses'])
+        payloads[helper] = {'vlan_id': item['vlan_id'],
+                            'dhcp_helper_address': {'version': item['version'],
+                                                    'octets': item['helper_addresses']}}
+        desired.append((helper, {}))
+
+    create, update, delete = reconcile(
+        collections['/vlans/dhcp-relay'], desired, state,
+        in_scope=lambda ele: ele['vlan_id'] in vlans)
+
+    operations = [{'method': 'DELETE', 'uri': '/vlans/dhcp-relay/' + helper}
+                  for helper in delete]
+    operations += [{'method': 'POST', 'uri': '/vlans/dhcp-relay', 'payload': payloads[helper]}
+                   for helper in create]
+    return operations
+
+
+COMMANDS = {
+    'config_vlan': config_vlan,
+    'config_vlan_port': config_vlan_port,
+    'config_vlan_ipaddress': config_vlan_ipaddress,
+    'config_vlan_dhcpHelperAddress': config_vlan_dhcpHelperAddress,
+    'config_vlan_qos': config_qos,
+    'config_vlan_acl': config_acl,
+    'config_vlan_igmp': config_igmp,
+}
+
+# Commands supporting the reconciliation of aggregate items with state
+RECONCILED_COMMANDS = ('config_vlan', 'config_vlan_port',
+                       'config_vlan_dhcpHelperAddress')
+
 """
 -------
 Name: run_module()
@@ -588,7 +931,7 @@ def run_module():
                 'config_vlan_qos','config_vlan_acl', 'config_vlan_igmp']),
         config=dict(type='str', required=False, default= "create",
                choices=["create","delete"]),
-        vlan_id=dict(type='int', required=True),
+        vlan_id=dict(type='int', required=False),
         name=dict(type='str', required=False, default=""),
         ip_address_mode=dict(type='str', required=False, default="IAAM_STATIC",
            choices = ['IAAM_DISABLED', 'IAAM_STATIC', 'IAAM_DHCP']),
@@ -624,20 +967,43 @@ def run_module():
         interval=dict(type='int', required=False, default=125),
     )
 
+    # Each aggregate item takes the per-VLAN options, unset ones are
+    # taken from the top level options of the task
+    aggregate_spec = dict((key, dict((name, spec[name]) for name in ('type', 'choices')
+                                     if name in spec))
+                          for key, spec in module_args.items()
+                          if key != 'command')
+    module_args['aggregate'] = dict(type='list', elements='dict',
+                                    required=False, options=aggregate_spec)
+    module_args['state'] = dict(type='str', required=False,
+                                choices=['merged', 'replaced', 'overridden'])
+
     module_args.update(arubaoss_argument_spec)
 
     result = dict(changed=False,warnings='Not Supported')
 
     module = AnsibleModule(
         argument_spec=module_args,
+        required_one_of=[['vlan_id', 'aggregate']],
         supports_check_mode=True
     )
 
+    if module.params['state']:
+        if not module.params['aggregate']:
+            module.fail_json(msg="state requires aggregate")
+        if module.params['command'] not in RECONCILED_COMMANDS:
+            module.fail_json(msg="state is supported with commands: {}".format(
+                ', '.join(RECONCILED_COMMANDS)))
+
     if module.check_mode:
         module.exit_json(**result)
 
     try:
-        if module.params['command'] == "config_vlan":
+        if module.params['state']:
+            result = reconcile_aggregate(module)
+        elif module.params['aggregate']:
+            result = config_aggregate(module)
+        elif module.params['command'] == "config_vlan":
             result = config_vlan(module)
         elif module.params['command'] == "config_vlan_dhcpHelperAddress":
             result = config_vlan_dhcpHelperAddress(module)
@@ -61,6 +61,13 @@ class ActionModule(_ActionModule):
             else:
                 self._task.args['provider'] = ActionModule.aossapi_implementation(provider, self._play_context)
 
+        elif self._play_context.connection == 'arubaoss_rest':
+            # Host, credentials & session are owned by the persistent
+            # connection, the module only needs to know to use it
+            provider = load_provider(arubaoss_provider_spec, self._task.args)
+            provider['transport'] = 'arubaoss_rest'
+            self._task.args['provider'] = provider
+
         result = super(ActionModule, self).run(task_vars=task_vars)
         return result
 
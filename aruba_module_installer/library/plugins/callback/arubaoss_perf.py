@@ -0,0 +1,205 @@
+# (C) Copyright 2020 Hewlett Packard Enterprise Development LP.
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = """
+---
+author: Aruba Networks (@ArubaNetworks)
+callback: arubaoss_perf
+type: aggregate
+short_description: Aggregates the REST latency of AOS-Switch modules across a playbook
+description:
+  - This callback collects the perf summary returned by the arubaoss REST
+    modules when perf is enabled, e.g. with ARUBAOSS_PERF=1 in the
+    environment. At the end of the playbook it displays the p50, p95 & p99
+    latency of each switch and of each REST uri, the round trips of each
+    task and the time spent logging in and out, and writes the report as
+    JSON and CSV files.
+version_added: "2.9"
+requirements:
+  - whitelist in configuration
+  - perf enabled in the arubaoss modules
+options:
+  report_dir:
+    description:
+      - Directory the JSON & CSV reports are written to. No report is
+        written when empty.
+    default: ~/.ansible/arubaoss_perf
+    env:
+      - name: ARUBAOSS_PERF_REPORT_DIR
+    ini:
+      - section: callback_arubaoss_perf
+        key: report_dir
+  top:
+    description:
+      - Number of switches and uris displayed, the slowest first.
+    type: int
+    default: 10
+    env:
+      - name: ARUBAOSS_PERF_TOP
+    ini:
+      - section: callback_arubaoss_perf
+        key: top
+"""
+
+import csv
+import json
+import math
+import os
+import re
+from datetime import datetime
+
+from ansible.module_utils._text import to_text
+from ansible.plugins.callback import CallbackBase
+
+# Path segments naming an object, e.g. the 10 of /vlans/10 or the 7-5 of
+# /vlans-ports/7-5, so the latency of a resource is kept once
+_ID_SEGMENT_RE = re.compile(r'^[\d.:~-]+$')
+_API_PREFIX_RE = re.compile(r'^/rest(/v\d+\.\d+)?')
+
+
+def percentile(values, percent):
+    ''' Returns the nearest-rank percentile of sorted values '''
+    if not values:
+        return 0
+    rank = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[min(max(rank, 0), len(values) - 1)]
+
+
+def uri_template(uri):
+    ''' Returns uri without the api version, query & object ids '''
+    path = _API_PREFIX_RE.sub('', uri.split('?')[0]) or '/'
+    return '/'.join('{id}' if _ID_SEGMENT_RE.match(segment) else segment
+                    for segment in path.split('/'))
+
+
+class Latency:
+    ''' Latency samples of a switch, uri or task '''
+
+    def __init__(self):
+        self.times = []
+        self.auth_time = 0.0
+        self.auth_requests = 0
+        self.retries = 0
+        self.runs = 0
+
+    def stats(self):
+        times = sorted(self.times)
+        return {
+            'requests': len(times),
+            'total': round(sum(times), 3),
+            'p50': round(percentile(times, 50), 4),
+            'p95': round(percentile(times, 95), 4),
+            'p99': round(percentile(times, 99), 4),
+            'max': round(times[-1], 4) if times else 0,
+            'auth_requests': self.auth_requests,
+            'auth_time': round(self.auth_time, 3),
+            'retries': self.retries,
+            'runs': self.runs,
+        }
+
+
+class CallbackModule(CallbackBase):
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'arubaoss_perf'
+    CALLBACK_NEEDS_WHITELIST = True
+
+    def __init__(self):
+        super(CallbackModule, self).__init__()
+        self.hosts = {}
+        self.uris = {}
+        self.tasks = {}
+
+    def _latency(self, index, key):
+        if key not in index:
+            index[key] = Latency()
+        return index[key]
+
+    def _add(self, host, task, perf):
+        host_latency = self._latency(self.hosts, host)
+        task_latency = self._latency(self.tasks, task)
+        for latency in (host_latency, task_latency):
+            latency.runs += 1
+            latency.auth_time += perf.get('auth_time', 0)
+            latency.auth_requests += perf.get('auth_requests', 0)
+            latency.retries += perf.get('retries', 0)
+
+        for method, uri, status, elapsed in perf.get('timings', []):
+            host_latency.times.append(elapsed)
+            task_latency.times.append(elapsed)
+            self._latency(self.uris, '{} {}'.format(method, uri_template(uri))).times.append(elapsed)
+
+    def _collect(self, result):
+        host = result._host.get_name()
+        task = result._task.get_name()
+        results = result._result
+        if isinstance(results.get('perf'), dict):
+            self._add(host, task, results['perf'])
+        # Loops, and arubaoss_fleet which returns the perf of each switch
+        for item in results.get('results') or []:
+            if isinstance(item, dict) and isinstance(item.get('perf'), dict):
+                self._add(to_text(item.get('host') or host), task, item['perf'])
+
+    def v2_runner_on_ok(self, result):
+        self._collect(result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._collect(result)
+
+    def _table(self, title, index, top):
+        rows = sorted(index.items(), key=lambda item: item[1].stats()['p95'], reverse=True)
+        self._display.banner(title)
+        self._display.display('{:<48} {:>8} {:>9} {:>9} {:>9} {:>9} {:>9}'.format(
+            '', 'requests', 'p50', 'p95', 'p99', 'total', 'auth'))
+        for key, latency in rows[:top]:
+            stats = latency.stats()
+            self._display.display('{:<48} {:>8} {:>9.4f} {:>9.4f} {:>9.4f} {:>9.3f} {:>9.3f}'.format(
+                key[:48], stats['requests'], stats['p50'], stats['p95'], stats['p99'],
+                stats['total'], stats['auth_time']))
+
+    def _write_report(self, report_dir, report):
+        report_dir = os.path.expanduser(report_dir)
+        if not os.path.isdir(report_dir):
+            os.makedirs(report_dir)
+        name = os.path.join(report_dir, 'arubaoss_perf_' + datetime.now().strftime('%Y%m%d%H%M%S'))
+
+        with open(name + '.json', 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+        fields = ['kind', 'name', 'requests', 'total', 'p50', 'p95', 'p99', 'max',
+                  'auth_requests', 'auth_time', 'retries', 'runs']
+        with open(name + '.csv', 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for kind in ('hosts', 'uris', 'tasks'):
+                for key, stats in sorted(report[kind].items()):
+                    writer.writerow([kind, key] + [stats[field] for field in fields[2:]])
+
+        return name
+
+    def v2_playbook_on_stats(self, stats):
+        if not self.hosts:
+            return
+
+        top = self.get_option('top')
+        self._table('AOS-SWITCH REST LATENCY BY HOST (seconds)', self.hosts, top)
+        self._table('AOS-SWITCH REST LATENCY BY URI (seconds)', self.uris, top)
+        self._table('AOS-SWITCH REST LATENCY BY TASK (seconds)', self.tasks, top)
+
+        report_dir = self.get_option('report_dir')
+        if not report_dir:
+            return
+
+        report = dict((kind, dict((key, latency.stats()) for key, latency in index.items()))
+                      for kind, index in (('hosts', self.hosts), ('uris', self.uris),
+                                          ('tasks', self.tasks)))
+        try:
+            name = self._write_report(report_dir, report)
+        except (IOError, OSError) as err:
+            self._display.warning('Could not write the arubaoss perf report: {}'.format(to_text(err)))
+            return
+        self._display.display('AOS-Switch REST latency report written to {}.json & .csv'.format(name))
@@ -18,47 +18,189 @@ version_added: "2.9"
 
 import json
 import re
-from itertools import chain
+import socket
 
 from ansible.errors import AnsibleConnectionFailure
-from ansible.module_utils._text import to_text
+from ansible.module_utils._text import to_bytes, to_text
 from ansible.module_utils.common._collections_compat import Mapping
 from ansible.module_utils.network.common.utils import to_list
 from ansible.plugins.cliconf import CliconfBase, enable_mode
 
+# Prompt of any context of the switch, e.g. sw(config)# or sw(vlan-5)#,
+# formatted with the hostname. The switch positions it with ANSI escapes
+# rather than a new line.
+_PROMPT_RE = br'(?<![\w.-])%s(?:\([^)\r\n]*\))?\s*[\^\*]?(?:\[[^\]\r\n]*\])? ?#'
+
+# Commands changing the prompt, sent on their own
+_NEW_PROMPT_RE = re.compile(r'^\s*(no\s+)?hostname\b', re.I)
+
+# Commands entering a context, which end a block: the commands of the
+# context are only sent once the switch has entered it
+_CONTEXT_RE = re.compile(r'^\s*(vlan|interface|router|tunnel|class|policy|'
+                         r'ip(v6)?\s+access-list|dhcp-server\s+pool)\b', re.I)
+
+
+def _blocks(commands, batch_size):
+    '''
+    Yields the index & commands of each block of up to batch_size, a
+    block ending after a command entering a context
+    '''
+    start = 0
+    block = []
+    for index, command in enumerate(commands):
+        if _NEW_PROMPT_RE.match(command):
+            if block:
+                yield start, block
+            yield index, [command]
+            start, block = index + 1, []
+            continue
+        block.append(command)
+        if len(block) >= batch_size or _CONTEXT_RE.match(command):
+            yield start, block
+            start, block = index + 1, []
+    if block:
+        yield start, block
+
 
 class Cliconf(CliconfBase):
     '''
     Cliconf class for AOS-Switch
     '''
 
-    def __init__(self, *args, **kwargs):
-        '''
-        init function
-        '''
-        super(Cliconf, self).__init__(*args, **kwargs)
-
     @enable_mode
     def get_config(self, source='running', format='text', flags=None):
         '''
-        Get the switch config
+        Get the switch config. The running-config is read with
+        show running-config all, or show running-config followed by flags
+        when given, e.g. [] for the config as displayed on the switch.
         '''
         if source not in ('running', 'startup'):
             return self.invalid_params("fetching configuration from {} is not"
                                        " supported".format(source))
         if source == 'running':
-            cmd = 'show running-config all'
-        else:
-            cmd = 'show configuration'
+            if flags is None:
+                cmd = 'show running-config all'
+            else:
+                cmd = ' '.join(['show running-config'] + to_list(flags)).strip()
+            return self.send_command(cmd)
+        cmd = 'show configuration'
         return self.send_command(cmd)
 
     @enable_mode
-    def edit_config(self, command):
+    def edit_config(self, command, batch_size=1):
         '''
-        Edit the switch config
+        Edit the switch config. Commands are written batch_size at a time
+        before their output is read, the switch running them while the
+        next are in flight. Sending stops after the block of the first
+        command which failed, whose index, command and error are
+        returned as error.
         '''
-        for cmd in chain(['configure terminal'], to_list(command), ['end']):
-            self.send_command(cmd)
+        commands = to_list(command)
+        self.send_command('configure terminal')
+
+        responses = []
+        error = None
+        try:
+            if not self._can_send_block():
+                batch_size = 1
+            for start, block in _blocks(commands, batch_size):
+                if len(block) == 1:
+                    outputs, failed = self._send_one(block[0])
+                else:
+                    outputs, failed = self._send_block(block)
+                responses.extend(outputs)
+                if failed is not None:
+                    error = {'index': start + failed, 'command': block[failed],
+                             'msg': outputs[failed]}
+                    break
+        finally:
+            try:
+                self.send_command('end')
+            except AnsibleConnectionFailure:
+                pass
+
+        return {'request': commands[:len(responses)], 'response': responses, 'error': error}
+
+    def _send_one(self, command):
+        try:
+            return [to_text(self.send_command(command), errors='surrogate_or_strict')], None
+        except AnsibleConnectionFailure as exc:
+            return [to_text(getattr(exc, 'message', exc), errors='surrogate_or_strict')], 0
+
+    def _can_send_block(self):
+        '''
+        Whether the connection exposes what _send_block writes to and reads
+        from: the shell of network_cli, its escape stripping and the errors
+        of the terminal plugin. These are not part of the connection API,
+        so commands are sent one at a time when any is missing.
+        '''
+        connection = self._connection
+        shell = getattr(connection, '_ssh_shell', None)
+        terminal = getattr(connection, '_terminal', None)
+        return (all(callable(getattr(shell, name, None))
+                    for name in ('sendall', 'recv', 'gettimeout', 'settimeout')) and
+                callable(getattr(connection, '_strip', None)) and
+                getattr(terminal, 'terminal_stderr_re', None) is not None)
+
+    def _send_block(self, commands):
+        '''
+        Writes commands to the switch at once, then reads until the prompt
+        following each came back. Returns the output of each command, and
+        the index of the first which matched an error of the terminal, or
+        whose echo is not found before its prompt, as then the output
+        cannot be told apart from that of the other commands.
+        '''
+        connection = self._connection
+        hostname = re.sub(br'(\(.*\))?\s*[\^\*]?(\[.*\])?\s*#\s*$', b'',
+                          to_bytes(connection.get_prompt()).strip())
+        prompt_re = re.compile(_PROMPT_RE % re.escape(hostname.split(b'\n')[-1].strip()))
+        stderr_re = connection._terminal.terminal_stderr_re
+
+        shell = connection._ssh_shell
+        timeout = shell.gettimeout()
+        shell.settimeout(connection.get_option('persistent_command_timeout'))
+        try:
+            for command in commands:
+                shell.sendall(to_bytes(command) + b'\r')
+
+            data = b''
+            prompts = []
+            while len(prompts) < len(commands):
+                chunk = shell.recv(4096)
+                if not chunk:
+                    raise AnsibleConnectionFailure('connection closed while sending %s' % commands[0])
+                # Escapes and prompts may arrive split across chunks
+                data += chunk
+                text = connection._strip(data)
+                prompts = list(prompt_re.finditer(text))
+        except socket.timeout:
+            raise AnsibleConnectionFailure('timeout value %s seconds reached while sending %s'
+                                           % (shell.gettimeout(), commands[0]))
+        finally:
+            shell.settimeout(timeout)
+
+        outputs = []
+        failed = None
+        end = 0
+        for index, (command, prompt) in enumerate(zip(commands, prompts)):
+            output = text[end:prompt.start()]
+            end = prompt.end()
+            command = to_bytes(command).strip()
+            # Long commands may be echoed wrapped
+            echoed = re.sub(br'\s+', b'', command) in re.sub(br'\s+', b'', output)
+            lines = [line for line in output.splitlines()
+                     if line.strip() and line.strip() != command]
+            output = b'\n'.join(lines)
+            if failed is None and not echoed:
+                failed = index
+                output = b'output of the command could not be told apart in its block'
+            elif failed is None and any(regex.search(output) for regex in stderr_re):
+                failed = index
+            outputs.append(to_text(output, errors='surrogate_or_strict'))
+        if failed is None and len(prompts) > len(commands):
+            failed = len(commands) - 1
+            outputs[failed] = u'more prompts than commands came back for the block'
+        return outputs, failed
 
     def get(self, command, prompt=None, answer=None, sendonly=False,
             newline=True, check_all=False):
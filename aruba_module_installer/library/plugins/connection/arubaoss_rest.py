@@ -0,0 +1,254 @@
+# (C) Copyright 2020 Hewlett Packard Enterprise Development LP.
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = """
+---
+author: Aruba Networks (@ArubaNetworks)
+connection: arubaoss_rest
+short_description: Use a persistent REST session to run AOS-Switch REST modules
+description:
+  - This connection plugin keeps one keep-alive HTTP(S) connection and one
+    REST login session per AOS-Switch in the persistent connection daemon.
+    The arubaoss REST modules send their requests through it instead of
+    opening a new connection and session in every task.
+version_added: "2.9"
+options:
+  host:
+    description:
+      - Specifies the remote device FQDN or IP address to establish the HTTP(S)
+        connection to.
+    default: inventory_hostname
+    vars:
+      - name: ansible_host
+  port:
+    type: int
+    description:
+      - Specifies the port on the remote device to listening for connections
+        when establishing the HTTP(S) connection.
+        When unspecified, will pick 80 or 443 based on the value of use_ssl
+    ini:
+      - section: defaults
+        key: remote_port
+    env:
+      - name: ANSIBLE_REMOTE_PORT
+    vars:
+      - name: ansible_port
+      - name: ansible_httpapi_port
+  network_os:
+    description:
+      - Configures the device platform network operating system.
+    vars:
+      - name: ansible_network_os
+  remote_user:
+    description:
+      - The username used to authenticate to the remote device when the REST
+        session is first established.
+    ini:
+      - section: defaults
+        key: remote_user
+    env:
+      - name: ANSIBLE_REMOTE_USER
+    vars:
+      - name: ansible_user
+  password:
+    description:
+      - Secret used to authenticate
+    vars:
+      - name: ansible_password
+      - name: ansible_httpapi_pass
+  use_ssl:
+    type: boolean
+    description:
+      - Whether to connect using SSL (HTTPS) or not (HTTP)
+    default: False
+    vars:
+      - name: ansible_httpapi_use_ssl
+  validate_certs:
+    type: boolean
+    description:
+      - Whether to validate SSL certificates of the switch
+    default: False
+    vars:
+      - name: ansible_httpapi_validate_certs
+  persistent_connect_timeout:
+    type: int
+    description:
+      - Configures, in seconds, the amount of time to wait when trying to
+        initially establish a persistent connection.  If this value expires
+        before the connection to the remote device is completed, the connection
+        will fail
+    default: 30
+    ini:
+      - section: persistent_connection
+        key: connect_timeout
+    env:
+      - name: ANSIBLE_PERSISTENT_CONNECT_TIMEOUT
+  persistent_command_timeout:
+    type: int
+    description:
+      - Configures, in seconds, the amount of time to wait for a command to
+        return from the remote device.  If this timer is exceeded before the
+        command returns, the connection plugin will raise an exception and
+        close
+    default: 10
+    ini:
+      - section: persistent_connection
+        key: command_timeout
+    env:
+      - name: ANSIBLE_PERSISTENT_COMMAND_TIMEOUT
+  persistent_log_messages:
+    type: boolean
+    description:
+      - This flag will enable logging the request sent and response received
+        from the target device in the ansible log file. For this option to work
+        'log_path' ansible configuration option is required to be set to a file
+        path with write access.
+    default: False
+    ini:
+      - section: persistent_connection
+        key: log_messages
+    env:
+      - name: ANSIBLE_PERSISTENT_LOG_MESSAGES
+    vars:
+      - name: ansible_persistent_log_messages
+"""
+
+import json
+import requests
+from ansible.errors import AnsibleConnectionFailure
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.six import PY3
+from ansible.module_utils.six.moves import cPickle
+from ansible.playbook.play_context import PlayContext
+from ansible.plugins.connection import NetworkConnectionBase
+
+
+# REST API version used to login & retrieve the REST versions supported
+# by the switch, available from firmware 16.08 onwards
+BOOTSTRAP_API_VERSION = 'v6.0'
+
+
+class Connection(NetworkConnectionBase):
+    '''AOS-Switch persistent REST connection'''
+
+    transport = 'arubaoss_rest'
+    has_pipelining = True
+
+    def __init__(self, play_context, new_stdin, *args, **kwargs):
+        super(Connection, self).__init__(play_context, new_stdin, *args, **kwargs)
+
+        self._http_session_handle = None
+        self._cookie = None
+        self._api_version = None
+
+    def _base_url(self):
+        use_ssl = self.get_option('use_ssl')
+        port = self._play_context.port or (443 if use_ssl else 80)
+        return '%s://%s:%s' % ('https' if use_ssl else 'http',
+                               self._play_context.remote_addr, port)
+
+    def update_play_context(self, pc_data):
+        """Updates the play context information for the connection"""
+        pc_data = to_bytes(pc_data)
+        if PY3:
+            pc_data = cPickle.loads(pc_data, encoding='bytes')
+        else:
+            pc_data = cPickle.loads(pc_data)
+        play_context = PlayContext()
+        play_context.deserialize(pc_data)
+
+        messages = ['updating play_context for connection']
+        self._play_context = play_context
+        return messages
+
+    def _http(self, path, method='GET', data=None):
+        url = self._base_url() + path
+        headers = {'Content-Type': 'application/json'}
+        if self._cookie:
+            headers['Cookie'] = self._cookie
+        try:
+            return self._http_session_handle.request(
+                method, url, data=data, headers=headers,
+                verify=self.get_option('validate_certs'),
+                timeout=self.get_option('persistent_command_timeout'))
+        except requests.exceptions.RequestException as exc:
+            raise AnsibleConnectionFailure('%s %s failed: %s' % (method, url, to_text(exc)))
+
+    def _login(self):
+        '''
+        Opens the REST session. The cookie is sent explicitly as the switch
+        scopes it to the login-sessions path of the api version used.
+        '''
+        self._cookie = None
+        path = '/rest/%s/login-sessions' % (self._api_version or BOOTSTRAP_API_VERSION)
+        payload = json.dumps({'userName': self._play_context.remote_user,
+                              'password': self._play_context.password})
+        response = self._http(path, method='POST', data=payload)
+        self._log_messages('login response %s' % response.status_code)
+        if response.status_code == 404:
+            raise AnsibleConnectionFailure('AOS-Switch Ansible support needs minimum Firmware version of 16.08.xx')
+        if response.status_code != 201:
+            raise AnsibleConnectionFailure('Login to %s failed: %s %s' % (
+                self._play_context.remote_addr, response.status_code, response.text))
+        self._cookie = response.headers.get('set-cookie')
+
+    def _connect(self):
+        if self._http_session_handle:
+            return
+        self.queue_message('vvvv', 'opening the rest session')
+        self._http_session_handle = requests.session()
+        self._http_session_handle.trust_env = False
+        try:
+            self._login()
+            response = self._http('/rest/version')
+        except AnsibleConnectionFailure:
+            self._http_session_handle = None
+            raise
+        if response.status_code != 200:
+            self._http_session_handle = None
+            raise AnsibleConnectionFailure('Unable to get REST version: %s %s' % (
+                response.status_code, response.text))
+        versions = response.json()['version_element']
+        self._api_version = versions[len(versions) - 1]['version']
+        self.queue_message('vvvv', 'using REST api %s' % self._api_version)
+        self._connected = True
+
+    def close(self):
+        if self._http_session_handle:
+            try:
+                self._http('/rest/%s/login-sessions' % self._api_version, method='DELETE')
+            except AnsibleConnectionFailure:
+                pass
+            self._http_session_handle.close()
+            self.queue_message('vvvv', 'closed the rest session')
+        self._http_session_handle = None
+        self._cookie = None
+        super(Connection, self).close()
+
+    def get_api_version(self):
+        '''Returns the latest REST api version supported by the switch'''
+        self._connect()
+        return self._api_version
+
+    def send_request(self, path, method='GET', data=None):
+        '''
+        Sends a REST request over the persistent session. path is relative
+        to the switch, e.g. /rest/v7.0/vlans. If the switch expired the
+        session (e.g. after a reboot) it is logged in again once.
+        '''
+        self._connect()
+        response = self._http(path, method=method, data=data)
+        self._log_messages('%s %s: %s' % (method, path, response.status_code))
+        if response.status_code == 401:
+            self._login()
+            response = self._http(path, method=method, data=data)
+
+        headers = dict((k.lower(), v) for k, v in response.headers.items())
+        return {'status': response.status_code,
+                'msg': '%s %s' % (response.status_code, response.reason),
+                'url': response.url,
+                'headers': headers,
+                'body': response.text}
@@ -0,0 +1,173 @@
+# (C) Copyright 2020 Hewlett Packard Enterprise Development LP.
+# GNU General Public License v3.0+
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+'''
+Tests the arubaoss cliconf plugin writing config commands in blocks,
+against a fake switch behind the shell of the connection.
+
+    python -m unittest discover -s tests/unit -t .
+'''
+
+import os
+import re
+import unittest
+
+try:
+    from importlib.util import module_from_spec, spec_from_file_location
+except ImportError:
+    from imp import load_source
+else:
+    def load_source(name, path):
+        spec = spec_from_file_location(name, path)
+        module = module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+from ansible.errors import AnsibleConnectionFailure
+
+PLUGINS = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..',
+                       'aruba_module_installer', 'library', 'plugins')
+cliconf = load_source('arubaoss_cliconf',
+                      os.path.join(PLUGINS, 'cliconf', 'arubaoss.py'))
+
+ESCAPES = b'\x1b[24;1H\x1b[2K'
+
+
+class FakeSwitch(object):
+    ''' Runs commands in the contexts of a switch named sw '''
+
+    def __init__(self):
+        self.context = b''
+        self.ran = []
+
+    def prompt(self):
+        if self.context:
+            return b'sw(' + self.context + b')# '
+        return b'sw# '
+
+    def run(self, command):
+        self.ran.append(command)
+        output = b''
+        if command == b'configure terminal':
+            self.context = b'config'
+        elif command == b'end':
+            self.context = b''
+        elif command == b'exit':
+            self.context = b'config'
+        elif re.match(br'(vlan|interface) \d+$', command):
+            if command == b'interface 99':
+                output = b'Invalid input: 99\r\n'
+            else:
+                self.context = command.replace(b' ', b'-')
+        elif command.startswith(b'bogus'):
+            output = b'Invalid input: bogus\r\n'
+        return command + b'\r\n' + output + ESCAPES + self.prompt()
+
+
+class FakeShell(object):
+    ''' The shell of network_cli, answering in small chunks '''
+
+    def __init__(self, switch, echo=True):
+        self.switch = switch
+        self.echo = echo
+        self.pending = b''
+        self.writes = []
+        self.timeout = 10
+
+    def gettimeout(self):
+        return self.timeout
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def sendall(self, data):
+        self.writes.append(data)
+        for command in data.split(b'\r')[:-1]:
+            reply = self.switch.run(command)
+            if not self.echo:
+                reply = reply[len(command):]
+            self.pending += reply
+
+    def recv(self, size):
+        # Prompts and escapes come split across chunks
+        data, self.pending = self.pending[:7], self.pending[7:]
+        return data
+
+
+class FakeTerminal(object):
+    terminal_stderr_re = [re.compile(br'Invalid input')]
+
+
+class FakeConnection(object):
+    ''' network_cli as seen by the cliconf plugin '''
+
+    def __init__(self, shell=True, echo=True):
+        self.switch = FakeSwitch()
+        if shell:
+            self._ssh_shell = FakeShell(self.switch, echo)
+            self._terminal = FakeTerminal()
+        self.sent = []
+
+    def get_prompt(self):
+        return self.switch.prompt()
+
+    def get_option(self, option):
+        return 5
+
+    def _strip(self, data):
+        return data.replace(ESCAPES, b'')
+
+    def send(self, command, **kwargs):
+        self.sent.append(command)
+        reply = self.switch.run(command)
+        if b'Invalid input' in reply:
+            raise AnsibleConnectionFailure('Invalid input')
+        return reply
+
+
+class TestEditConfig(unittest.TestCase):
+
+    def edit(self, commands, batch_size, **kwargs):
+        connection = FakeConnection(**kwargs)
+        result = cliconf.Cliconf(connection).edit_config(commands, batch_size=batch_size)
+        return connection, result
+
+    def test_blocks_end_after_context(self):
+        commands = ['vlan 2', 'name "a"', 'tagged 1', 'exit', 'vlan 3', 'name "b"']
+        connection, result = self.edit(commands, 10)
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['request'], commands)
+        self.assertEqual(len(result['response']), len(commands))
+        # vlan 2 alone, then the block ending with vlan 3, then name "b"
+        self.assertEqual(connection.sent, [b'configure terminal', b'vlan 2', b'name "b"', b'end'])
+        self.assertEqual(connection._ssh_shell.writes,
+                         [b'name "a"\r', b'tagged 1\r', b'exit\r', b'vlan 3\r'])
+
+    def test_failed_context_stops_its_commands(self):
+        commands = ['vlan 2', 'name "a"', 'interface 99', 'name "b"', 'enable']
+        connection, result = self.edit(commands, 10)
+        self.assertEqual(result['error']['index'], 2)
+        self.assertEqual(result['error']['command'], 'interface 99')
+        self.assertNotIn(b'name "b"', connection.switch.ran)
+
+    def test_failed_command_in_block(self):
+        commands = ['name "a"', 'bogus 1', 'name "c"', 'vlan 4', 'name "d"']
+        connection, result = self.edit(commands, 10)
+        self.assertEqual(result['error']['index'], 1)
+        self.assertIn('Invalid input', result['error']['msg'])
+        self.assertNotIn(b'name "d"', connection.switch.ran)
+
+    def test_unmatched_output_fails(self):
+        connection, result = self.edit(['name "a"', 'tagged 1'], 10, echo=False)
+        self.assertEqual(result['error']['index'], 0)
+
+    def test_falls_back_without_shell(self):
+        commands = ['vlan 2', 'name "a"', 'tagged 1']
+        connection, result = self.edit(commands, 10, shell=False)
+        self.assertIsNone(result['error'])
+        self.assertEqual(connection.sent, [b'configure terminal', b'vlan 2', b'name "a"',
+                                           b'tagged 1', b'end'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2020 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+Benchmarks the arubaoss REST modules against arubaoss_simulator.py.
+
+Each scenario runs modules as Ansible would, one process per task, against
+a simulated switch with the given latency, and counts the REST round trips
+the switch served and the wall time. The arubaoss module_utils must be
+installed, e.g. with aruba_module_installer.py.
+
+Usage:
+    python tools/arubaoss_benchmark.py --latency 0.02 --output results.json
+    python tools/arubaoss_benchmark.py --baseline results.json
+
+With --baseline, the run fails if a scenario makes more round trips than
+the baseline, or takes longer by more than --tolerance.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from arubaoss_simulator import Simulator
+
+LIBRARY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'aruba_module_installer', 'library', 'modules', 'network', 'arubaoss')
+
+
+def _vlans(first, count):
+    return [{'vlan_id': vlan_id, 'name': 'bench{}'.format(vlan_id)}
+            for vlan_id in range(first, first + count)]
+
+
+# Scenarios run in order against the same switch, each a list of tasks,
+# i.e. (module, args) run one after the other
+SCENARIOS = [
+    ('vlan_create_20_tasks', [('arubaoss_vlan', {'vlan_id': vlan['vlan_id'], 'name': vlan['name']})
+                              for vlan in _vlans(2, 20)]),
+    ('vlan_create_200_aggregate', [('arubaoss_vlan', {
+        'command': 'config_vlan', 'state': 'merged', 'aggregate': _vlans(100, 200)})]),
+    ('vlan_unchanged_200_aggregate', [('arubaoss_vlan', {
+        'command': 'config_vlan', 'state': 'merged', 'aggregate': _vlans(100, 200)})]),
+    ('vlan_ports_48_aggregate', [('arubaoss_vlan', {
+        'command': 'config_vlan_port', 'vlan_id': 100, 'port_mode': 'POM_TAGGED_STATIC',
+        'aggregate': [{'port_id': str(port)} for port in range(1, 49)]})]),
+    ('ports_48_aggregate', [('arubaoss_interface', {
+        'state': 'merged',
+        'aggregate': [{'interface': str(port), 'description': 'bench{}'.format(port)}
+                      for port in range(1, 49)]})]),
+    ('facts_all', [('arubaoss_facts', {})]),
+    ('file_transfer', [('arubaoss_file_transfer', {
+        'file_url': 'http://192.0.2.1/bench.swi', 'file_type': 'FTT_FIRMWARE',
+        'action': 'FTA_DOWNLOAD', 'boot_image': 'BI_SECONDARY_IMAGE'})]),
+]
+
+
+def run_task(library, module, args, env):
+    ''' Runs module as Ansible does, returns its result '''
+    fd, path = tempfile.mkstemp(suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'ANSIBLE_MODULE_ARGS': args}, f)
+        proc = subprocess.Popen([sys.executable, os.path.join(library, module + '.py'), path],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        out, err = proc.communicate()
+    finally:
+        os.remove(path)
+    try:
+        return json.loads(out.decode('utf-8'))
+    except ValueError:
+        return {'failed': True, 'msg': (err or out).decode('utf-8', 'replace').strip()[-500:]}
+
+
+def run_scenario(sim, library, tasks, connection, env):
+    sim.reset_stats()
+    failed = []
+    start = time.time()
+    for module, args in tasks:
+        task_args = dict(connection)
+        task_args.update(args)
+        result = run_task(library, module, task_args, env)
+        if result.get('failed'):
+            failed.append('{}: {}'.format(module, result.get('msg')))
+    elapsed = time.time() - start
+    return {
+        'tasks': len(tasks),
+        'round_trips': sim.total_requests(),
+        'logins': sum(count for key, count in sim.stats.items()
+                      if key.startswith('POST ') and key.endswith('/login-sessions')),
+        'wall_time': round(elapsed, 3),
+        'failed': failed,
+    }
+
+
+def compare(results, baseline, tolerance):
+    ''' Returns the regressions of results against baseline '''
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['round_trips'] > base['round_trips']:
+            regressions.append('{}: {} round trips, {} in baseline'.format(
+                name, result['round_trips'], base['round_trips']))
+        if result['wall_time'] > base['wall_time'] * (1 + tolerance):
+            regressions.append('{}: {}s, {}s in baseline'.format(
+                name, result['wall_time'], base['wall_time']))
+    return regressions
+
+
+def define_arguments():
+    parser = argparse.ArgumentParser(description='Benchmarks the arubaoss REST modules.')
+    parser.add_argument('--library', default=LIBRARY, help='directory of the arubaoss modules')
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='seconds the simulated switch spends on every request')
+    parser.add_argument('--max-concurrent', type=int, default=0,
+                        help='requests the simulated switch serves at once')
+    parser.add_argument('--scenario', action='append',
+                        help='scenario to run, all by default; can be repeated')
+    parser.add_argument('--output', help='file the results are written to, as JSON')
+    parser.add_argument('--baseline', help='results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='share of wall time a scenario may take over the baseline')
+    return parser
+
+
+def main():
+    args = define_arguments().parse_args()
+    scenarios = [(name, tasks) for name, tasks in SCENARIOS
+                 if not args.scenario or name in args.scenario]
+
+    # A file transfer completes by the first status poll, so that round
+    # trips do not depend on timing
+    sim = Simulator(latency=args.latency, max_concurrent=args.max_concurrent,
+                    transfer_time=0.0, ports=48).start()
+    cache_dir = tempfile.mkdtemp(prefix='arubaoss_bench')
+    env = dict(os.environ, ARUBAOSS_CACHE_DIR=cache_dir)
+    connection = {'host': '127.0.0.1', 'port': sim.port, 'username': 'manager',
+                  'password': 'bench', 'use_ssl': False}
+
+    results = {}
+    try:
+        # Scenarios start with the api version & capabilities of the switch
+        # cached, as in a playbook past its first task
+        run_task(args.library, 'arubaoss_facts', dict(connection, gather_subset=['system']), env)
+
+        print('{:<32} {:>6} {:>12} {:>7} {:>10}'.format(
+            'scenario', 'tasks', 'round trips', 'logins', 'wall time'))
+        for name, tasks in scenarios:
+            result = run_scenario(sim, args.library, tasks, connection, env)
+            results[name] = result
+            print('{:<32} {:>6} {:>12} {:>7} {:>9.3f}s'.format(
+                name, result['tasks'], result['round_trips'], result['logins'],
+                result['wall_time']))
+            for failure in result['failed']:
+                print('    failed {}'.format(failure))
+    finally:
+        sim.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    status = 1 if any(result['failed'] for result in results.values()) else 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION {}'.format(regression))
+        if regressions:
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,511 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2020 Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+Simulates the REST API of an AOS-Switch, to run the arubaoss modules
+without hardware, e.g. for arubaoss_benchmark.py or offline playbook runs.
+
+The VLANs, ports, VLAN ports, ACLs, QoS policies, syslog & SNMP
+collections, system status, reboot and file transfer the modules use are
+kept in memory. Each request can be delayed to mimic the management CPU
+of a switch, the number of login sessions and of requests handled at once
+limited, and errors injected.
+
+Usage:
+    python tools/arubaoss_simulator.py --port 8080 --latency 0.05 --vlans 200
+
+then point the modules at it, e.g. host 127.0.0.1, port 8080, use_ssl false,
+any username & password. GET /sim/stats returns the requests counted by
+method & uri, POST /sim/reset zeroes them.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+API_VERSIONS = ['v1.0', 'v2.0', 'v3.0', 'v4.0', 'v5.0', 'v6.0', 'v7.0']
+
+# Collections by uri: their element list, the id of an element from its
+# fields (dotted for nested fields) and the fields set when created
+COLLECTIONS = {
+    'vlans': ('vlan_element', '{vlan_id}', {
+        'status': 'VS_PORT_BASED', 'type': 'VT_STATIC', 'is_jumbo_enabled': False,
+        'is_voice_enabled': False, 'is_dsnoop_enabled': False,
+        'is_dhcp_server_enabled': False, 'is_management_vlan': False}),
+    'vlans-ports': ('vlan_port_element', '{vlan_id}-{port_id}', {
+        'port_mode': 'POM_UNTAGGED'}),
+    'vlans/dhcp-relay': ('dhcp_relay_element', '{vlan_id}-{dhcp_helper_address.octets}', {}),
+    'ports': ('port_element', '{id}', {}),
+    'acls': ('acl_element', '{acl_name}~{acl_type}', {}),
+    'ports-access-groups': ('acl_port_policy_element', '{port_id}-{acl_id}-{direction}', {}),
+    'vlans-access-groups': ('acl_vlan_policy_element', '{vlan_id}-{acl_id}-{direction}', {}),
+    'qos/policies': ('qos_policy_element', '{policy_name}~{policy_type}', {}),
+    'qos/traffic-classes': ('traffic_class_element', '{class_name}~{class_type}', {}),
+    'qos/ports-policies': ('qos_port_policy_element', '{port_id}-{policy_id}-{direction}', {}),
+    'qos/vlans-policies': ('qos_vlan_policy_element', '{vlan_id}-{policy_id}-{direction}', {}),
+    'syslog/servers': ('syslog_server_element', '{ip_address.octets}', {}),
+    'snmp-server/communities': ('snmp_server_community_element', '{community_name}', {}),
+}
+
+# Collections of each object of a collection, e.g. /acls/{id}/rules
+SUB_COLLECTIONS = {
+    'vlans': {'ipaddresses': ('ip_address_subnet_element', '{ip_address.octets}', {})},
+    'acls': {'rules': ('acl_rule_element', '{sequence_no}', {})},
+    'qos/policies': {'policy-actions': ('qos_policy_action_element', '{sequence_no}', {})},
+}
+
+# Objects read and replaced whole
+RESOURCES = {
+    'system': {'name': 'Aruba-Simulator', 'location': '', 'contact': ''},
+    'system/status': {'name': 'Aruba-Simulator', 'firmware_version': 'KB.16.10.0001',
+                      'hardware_revision': 'JL322A', 'product_model': 'Aruba 2930M',
+                      'serial_number': 'SIM0000001', 'sys_fan_status': True},
+    'stp': {'is_enabled': False, 'priority': 8, 'mode': 'STM_MSTP'},
+    'dot1x': {'is_dot1x_enabled': False, 'cached_reauth_delay': 0},
+    'config/ntp': {'enable': False, 'broadcast': False},
+    'config/timesync': {'timesync': 'TTT_NONE'},
+    'config/ntp/server/ip4addr': {'ntpServerIp4addr_element': []},
+}
+
+# Readable without a session, as while a switch reboots
+PUBLIC = ('system/status',)
+
+_FIELD_RE = re.compile(r'{([\w.]+)}')
+
+
+class SimulatedError(Exception):
+
+    def __init__(self, status, message):
+        super(SimulatedError, self).__init__(message)
+        self.status = status
+        self.message = message
+
+
+def element_id(template, payload):
+    ''' Returns the id of an element from its payload fields '''
+    def field(match):
+        value = payload
+        for name in match.group(1).split('.'):
+            if not isinstance(value, dict) or name not in value:
+                raise SimulatedError(400, 'Missing field {}'.format(match.group(1)))
+            value = value[name]
+        return str(value)
+    return _FIELD_RE.sub(field, template)
+
+
+class Collection(object):
+
+    def __init__(self, uri, element, template, defaults):
+        self.uri = uri
+        self.element = element
+        self.template = template
+        self.defaults = defaults
+        self.items = {}
+
+    def add(self, payload, replace=False):
+        if self.element == 'acl_rule_element' and 'sequence_no' not in payload:
+            payload = dict(payload, sequence_no=10 * (len(self.items) + 1))
+        obj_id = element_id(self.template, payload)
+        if obj_id in self.items and not replace:
+            raise SimulatedError(400, 'The object already exists: {}'.format(obj_id))
+        obj = dict(self.defaults)
+        obj.update(payload)
+        obj['uri'] = '{}/{}'.format(self.uri, obj_id)
+        if self.element in ('acl_element', 'qos_policy_element', 'traffic_class_element'):
+            obj['id'] = obj_id
+        self.items[obj_id] = obj
+        return obj
+
+    def page(self, query):
+        elements = list(self.items.values())
+        total = len(elements)
+        if 'start_index' in query:
+            start = int(query['start_index'])
+            elements = elements[start:start + int(query.get('count', total))]
+        return {'uri': self.uri,
+                'collection_result': {'total_elements_count': total,
+                                      'filtered_elements_count': len(elements)},
+                self.element: elements}
+
+
+class SwitchState(object):
+    ''' Configuration & operational state of the simulated switch '''
+
+    def __init__(self, vlans=1, ports=24, firmware=None):
+        self.collections = {}
+        for uri, (element, template, defaults) in COLLECTIONS.items():
+            self.collections[uri] = Collection('/' + uri, element, template, defaults)
+        self.resources = json.loads(json.dumps(RESOURCES))
+        if firmware:
+            self.resources['system/status']['firmware_version'] = firmware
+
+        for port in range(1, ports + 1):
+            self.collections['ports'].add({
+                'id': str(port), 'name': '', 'is_port_enabled': True, 'is_port_up': False,
+                'config_mode': 'PCM_AUTO', 'trunk_mode': 'PTT_NONE',
+                'lacp_status': 'LAS_DISABLED', 'is_flow_control_enabled': False,
+                'is_dsnoop_port_trusted': False})
+        self.collections['vlans'].add({'vlan_id': 1, 'name': 'DEFAULT_VLAN'})
+        for vlan_id in range(2, vlans + 1):
+            self.collections['vlans'].add({'vlan_id': vlan_id, 'name': 'VLAN{}'.format(vlan_id)})
+        for port in range(1, ports + 1):
+            self.collections['vlans-ports'].add({'vlan_id': 1, 'port_id': str(port)})
+
+        self.transfer_done = 0
+        self.rebooted_until = 0
+
+    def resolve(self, path):
+        '''
+        Returns the collection of path and the rest of the path, e.g. the
+        acls/{id}/rules collection and [seq] for acls/{id}/rules/{seq}.
+        '''
+        segments = path.split('/')
+        for length in range(len(segments), 0, -1):
+            uri = '/'.join(segments[:length])
+            if uri in self.collections:
+                collection, rest = self.collections[uri], segments[length:]
+                break
+        else:
+            return None, segments
+
+        sub = SUB_COLLECTIONS.get(uri, {})
+        if len(rest) >= 2 and rest[1] in sub:
+            parent = rest[0]
+            if parent not in collection.items:
+                raise SimulatedError(404, 'Not found: {}/{}'.format(uri, parent))
+            sub_uri = '{}/{}/{}'.format(uri, parent, rest[1])
+            if sub_uri not in self.collections:
+                element, template, defaults = sub[rest[1]]
+                self.collections[sub_uri] = Collection('/' + sub_uri, element, template, defaults)
+            return self.collections[sub_uri], rest[2:]
+        return collection, rest
+
+    def handle(self, method, path, query, payload):
+        ''' Returns the status & body of a request for path, without /rest/vX.Y/ '''
+        if path == 'file-transfer' and method == 'POST':
+            if time.time() < self.transfer_done:
+                return 200, {'message': 'Another download is in progress'}
+            self.transfer_done = time.time() + self.transfer_time
+            return 202, {'message': 'File transfer initiated'}
+        if path == 'file-transfer/status' and method == 'GET':
+            status = 'FTS_IN_PROGRESS' if time.time() < self.transfer_done else 'FTS_COMPLETED'
+            return 200, {'status': status}
+        if path == 'system/reboot' and method == 'POST':
+            self.rebooted_until = time.time() + self.reboot_time
+            return 200, {'message': 'Device is rebooting'}
+
+        if path in self.resources:
+            if method == 'GET':
+                return 200, dict(self.resources[path], uri='/' + path)
+            if method == 'PUT':
+                self.resources[path].update(payload or {})
+                return 200, dict(self.resources[path], uri='/' + path)
+            raise SimulatedError(405, 'Method not allowed')
+
+        collection, rest = self.resolve(path)
+        if collection is None:
+            raise SimulatedError(404, 'Not found: {}'.format(path))
+
+        if not rest:
+            if method == 'GET':
+                return 200, collection.page(query)
+            if method == 'POST':
+                return 201, collection.add(payload or {})
+            raise SimulatedError(405, 'Method not allowed')
+
+        obj_id = '/'.join(rest)
+        if obj_id not in collection.items:
+            raise SimulatedError(404, 'Not found: {}'.format(path))
+        if method == 'GET':
+            return 200, collection.items[obj_id]
+        if method == 'PUT':
+            obj = collection.items[obj_id]
+            obj.update(payload or {})
+            return 200, obj
+        if method == 'DELETE':
+            del collection.items[obj_id]
+            return 204, None
+        raise SimulatedError(405, 'Method not allowed')
+
+
+class Simulator(object):
+    '''
+    The simulated switch and its HTTP server. latency (plus up to jitter)
+    seconds are spent on every request, at most max_concurrent requests
+    are served at once (0 for no limit) and at most max_sessions login
+    sessions are open. error_rate & drop_rate are the share of requests
+    answered with error_status or dropped without an answer.
+    '''
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 max_sessions=5, session_timeout=600, max_concurrent=0,
+                 error_rate=0.0, error_status=503, drop_rate=0.0,
+                 transfer_time=5.0, reboot_time=10.0, api_versions=None,
+                 vlans=1, ports=24, firmware=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_sessions = max_sessions
+        self.session_timeout = session_timeout
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.api_versions = api_versions or API_VERSIONS
+        self.random = random.Random(seed)
+
+        self.state = SwitchState(vlans, ports, firmware)
+        self.state.transfer_time = transfer_time
+        self.state.reboot_time = reboot_time
+        self.sessions = {}
+        self.session_count = 0
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.busy = threading.Semaphore(max_concurrent) if max_concurrent else None
+
+        self.server = _Server((host, port), _Handler)
+        self.server.simulator = self
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        ''' Serves requests from a background thread '''
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {}
+
+    def count(self, method, path):
+        key = '{} {}'.format(method, path)
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def total_requests(self):
+        with self.lock:
+            return sum(self.stats.values())
+
+    def _authorized(self, cookie):
+        now = time.time()
+        with self.lock:
+            for session, last_used in list(self.sessions.items()):
+                if now - last_used > self.session_timeout:
+                    del self.sessions[session]
+            if cookie in self.sessions:
+                self.sessions[cookie] = now
+                return True
+        return False
+
+    def login(self):
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                raise SimulatedError(503, 'Session limit reached')
+            self.session_count += 1
+            cookie = 'sessionId=sim{:08d}'.format(self.session_count)
+            self.sessions[cookie] = time.time()
+            return cookie
+
+    def logout(self, cookie):
+        with self.lock:
+            if self.sessions.pop(cookie, None) is None:
+                raise SimulatedError(401, 'Not logged in')
+
+    def delay(self):
+        seconds = self.latency + self.random.uniform(0, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        sim = self.server.simulator
+
+        path, _, query = self.path.partition('?')
+        query = dict(item.partition('=')[::2] for item in query.split('&') if item)
+
+        if path.startswith('/sim/'):
+            if path == '/sim/stats':
+                return self._reply(200, {'requests': sim.total_requests(), 'by_uri': sim.stats,
+                                         'sessions': len(sim.sessions)})
+            if path == '/sim/reset':
+                sim.reset_stats()
+                return self._reply(204)
+            return self._reply(404, {'message': 'Not found'})
+
+        template = re.sub(r'/(\d[\w.~:-]*)(?=/|$)', '/{id}', path)
+        sim.count(method, template)
+
+        if sim.busy:
+            sim.busy.acquire()
+        try:
+            sim.delay()
+            if sim.drop_rate and sim.random.random() < sim.drop_rate:
+                self.close_connection = True
+                return
+            try:
+                status, reply, headers = self._dispatch(sim, method, path, query, body)
+            except SimulatedError as err:
+                status, reply, headers = err.status, {'message': err.message}, None
+            except ValueError:
+                status, reply, headers = 400, {'message': 'Invalid JSON'}, None
+            self._reply(status, reply, headers)
+        finally:
+            if sim.busy:
+                sim.busy.release()
+
+    def _dispatch(self, sim, method, path, query, body):
+        if time.time() < sim.state.rebooted_until:
+            raise SimulatedError(503, 'Device is rebooting')
+
+        if path == '/rest/version' and method == 'GET':
+            return 200, {'version_element': [{'version': version}
+                                             for version in sim.api_versions]}, None
+
+        match = re.match(r'^/rest/(v\d+\.\d+)/(.*)$', path)
+        if not match or match.group(1) not in sim.api_versions:
+            raise SimulatedError(404, 'Not found: {}'.format(path))
+        path = match.group(2).rstrip('/')
+        cookie = self.headers.get('Cookie')
+
+        if path == 'login-sessions':
+            if method == 'POST':
+                cookie = sim.login()
+                return 201, {'uri': '/login-sessions', 'cookie': cookie}, {'Set-Cookie': cookie}
+            if method == 'DELETE':
+                sim.logout(cookie)
+                return 204, None, None
+
+        if not (method == 'GET' and path in PUBLIC) and not sim._authorized(cookie):
+            raise SimulatedError(401, 'Login required')
+
+        if sim.error_rate and sim.random.random() < sim.error_rate:
+            raise SimulatedError(sim.error_status, 'Simulated error')
+
+        payload = json.loads(body.decode('utf-8')) if body else None
+        with sim.lock:
+            status, reply = sim.state.handle(method, path, query, payload)
+            if method == 'POST' and path == 'system/reboot':
+                sim.sessions.clear()
+        return status, reply, None
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+def define_arguments():
+    parser = argparse.ArgumentParser(description='Simulates the REST API of an AOS-Switch.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds spent on every request')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='up to these seconds are added to the latency at random')
+    parser.add_argument('--max-sessions', type=int, default=5,
+                        help='login sessions open at once')
+    parser.add_argument('--session-timeout', type=int, default=600,
+                        help='seconds an idle session stays open')
+    parser.add_argument('--max-concurrent', type=int, default=0,
+                        help='requests served at once, 0 for no limit')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='share of requests answered with --error-status')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--drop-rate', type=float, default=0.0,
+                        help='share of requests dropped without an answer')
+    parser.add_argument('--transfer-time', type=float, default=5.0,
+                        help='seconds a file transfer takes')
+    parser.add_argument('--reboot-time', type=float, default=10.0,
+                        help='seconds a reboot takes')
+    parser.add_argument('--vlans', type=int, default=1, help='VLANs configured at start')
+    parser.add_argument('--ports', type=int, default=24, help='ports of the switch')
+    parser.add_argument('--firmware', help='firmware version, e.g. YA.16.10.0001')
+    parser.add_argument('--seed', type=int, help='seed of the injected errors & jitter')
+    return parser
+
+
+def main():
+    args = define_arguments().parse_args()
+    sim = Simulator(host=args.host, port=args.port, latency=args.latency,
+                    jitter=args.jitter, max_sessions=args.max_sessions,
+                    session_timeout=args.session_timeout,
+                    max_concurrent=args.max_concurrent, error_rate=args.error_rate,
+                    error_status=args.error_status, drop_rate=args.drop_rate,
+                    transfer_time=args.transfer_time, reboot_time=args.reboot_time,
+                    vlans=args.vlans, ports=args.ports, firmware=args.firmware,
+                    seed=args.seed)
+    print('Simulating an AOS-Switch REST API on http://{}:{}/rest'.format(args.host, sim.port))
+    try:
+        sim.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.server.server_close()
+
+
+if __name__ == '__main__':
+    main()